@@ -0,0 +1,304 @@
+// Client-side time windows and filters: the bundle in the period-bundle store
+// holds the prefix sums for every key of the cube, so moving the slider,
+// playing it back or changing a filter never calls the server. The map and pie are rebuilt the
+// same way flow_map.trace_data() and odmatrix.destination_totals() do.
+(function() {
+    var MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+
+    function monthLabel(month) {
+        return MONTH_NAMES[month % 12] + " " + Math.floor(month / 12);
+    }
+
+    function windowLabel(first, last) {
+        return first === last ? monthLabel(first) : monthLabel(first) + " – " + monthLabel(last);
+    }
+
+    function grouped(value) {
+        return String(value).replace(/\B(?=(\d{3})+(?!\d))/g, ",");
+    }
+
+    function markerSize(radius) {
+        // Same arithmetic as flow_map.marker_size()
+        return Math.floor(200 * radius + 0.5) / 100;
+    }
+
+    function clamp(bundle, value) {
+        var first = Math.min(Math.max(value[0], bundle.first), bundle.last);
+        var last = Math.min(Math.max(value[1], first), bundle.last);
+        return [first, last];
+    }
+
+    function keyFilters(bundle, selections) {
+        // One lookup table per filter with a selection, as in TimeIndex.mask()
+        var tests = [];
+        bundle.filters.forEach(function(filter, j) {
+            var names = selections && selections[j];
+            if (names && names.length) {
+                tests.push({
+                    codes: filter.codes,
+                    allowed: filter.names.map(function(name) {
+                        return names.indexOf(name) >= 0;
+                    })
+                });
+            }
+        });
+        return tests;
+    }
+
+    function exactTotals(bundle, first, last) {
+        // A period's own totals when the window is exactly its window, as in
+        // TimeIndex.totals()
+        for (var i = 0; i < bundle.flows.exact.length; i++) {
+            var window = bundle.flows.exact[i].window;
+            if (window[0] === first && window[1] === last) {
+                return bundle.flows.exact[i].totals;
+            }
+        }
+        return null;
+    }
+
+    function flowTotals(bundle, first, last, selections) {
+        // Window totals per key, summed into the flows they add to
+        var lo = first - bundle.first;
+        var hi = last - bundle.first + 1;
+        var exact = exactTotals(bundle, first, last);
+        var tests = keyFilters(bundle, selections);
+        var totals = bundle.flows.keys.map(function() {
+            return 0;
+        });
+        bundle.flows.cumulative.forEach(function(row, i) {
+            var flow = bundle.flows.flow[i];
+            if (flow < 0) {
+                return;
+            }
+            for (var t = 0; t < tests.length; t++) {
+                if (tests[t].allowed[tests[t].codes[i]] !== true) {
+                    return;
+                }
+            }
+            totals[flow] += exact ? exact[i] : row[hi] - row[lo];
+        });
+        return totals;
+    }
+
+    function overlapPeriod(bundle, first, last) {
+        var best = null;
+        var bestOverlap = -Infinity;
+        Object.keys(bundle.periods).forEach(function(period) {
+            var range = bundle.periods[period].window;
+            var overlap = Math.min(range[1], last) - Math.max(range[0], first);
+            if (overlap > bestOverlap) {
+                best = period;
+                bestOverlap = overlap;
+            }
+        });
+        return best;
+    }
+
+    function windowNames(bundle, first, last) {
+        var periods = Object.keys(bundle.periods);
+        for (var i = 0; i < periods.length; i++) {
+            var period = bundle.periods[periods[i]];
+            if (period.window[0] === first && period.window[1] === last) {
+                return [period.title, periods[i]];
+            }
+        }
+        var name = windowLabel(first, last);
+        return [bundle.window_title.replace("{name}", name), name];
+    }
+
+    function mapTraces(bundle, totals) {
+        var style = bundle.map_style;
+        var lines = style.line_widths.map(function() {
+            return {lat: [], lon: []};
+        });
+        var markers = {};
+        style.marker_kinds.forEach(function(kind) {
+            markers[kind] = {lat: [], lon: [], text: [], size: []};
+        });
+
+        function lineBucket(weight) {
+            var bucket = 0;
+            style.line_widths.forEach(function(width, i) {
+                if (width <= Math.max(weight, style.line_widths[0])) {
+                    bucket = i;
+                }
+            });
+            return bucket;
+        }
+
+        function addMarker(kind, location, value, popup) {
+            var radius = Math.min(style.max_radius, Math.max(style.min_radius, value / style.radius_scale));
+            var trace = markers[kind];
+            trace.lat.push(location[0]);
+            trace.lon.push(location[1]);
+            trace.text.push(popup);
+            trace.size.push(markerSize(radius));
+        }
+
+        // Origin dots follow the order origins first show an external flow
+        var originTotals = bundle.flows.origins.map(function() {
+            return 0;
+        });
+        var originOrder = [];
+        bundle.flows.keys.forEach(function(key, i) {
+            var total = totals[i];
+            if (total <= 0) {
+                return;
+            }
+            if (key.origin !== null) {
+                if (originTotals[key.origin] === 0) {
+                    originOrder.push(key.origin);
+                }
+                originTotals[key.origin] += total;
+            }
+            key.parts.forEach(function(part) {
+                var value = Math.floor(total * part.share[0] / part.share[1]);
+                if (part.shape === "line") {
+                    var weight = part.weight !== null ? part.weight : Math.max(2, value / style.weight_scale);
+                    var trace = lines[lineBucket(weight)];
+                    trace.lat.push(part.path[0][0], part.path[1][0], null);
+                    trace.lon.push(part.path[0][1], part.path[1][1], null);
+                } else {
+                    addMarker(part.kind, part.location, value, part.popup.replace("{value}", grouped(value)));
+                }
+            });
+        });
+        originOrder.forEach(function(i) {
+            var origin = bundle.flows.origins[i];
+            addMarker("origin", origin.location, originTotals[i],
+                      "Total externally displaced from " + origin.name + ": " + grouped(originTotals[i]));
+        });
+
+        return lines.concat(style.marker_kinds.map(function(kind) {
+            return markers[kind];
+        }));
+    }
+
+    function pieTrace(bundle, totals) {
+        var labels = [];
+        var values = {};
+        var origins = {};
+        bundle.flows.keys.forEach(function(key, i) {
+            var total = totals[i];
+            if (total <= 0) {
+                return;
+            }
+            key.pie.labels.forEach(function(slice) {
+                var label = slice[0];
+                if (!(label in values)) {
+                    labels.push(label);
+                    values[label] = 0;
+                    origins[label] = [];
+                }
+                values[label] += Math.floor(total * slice[1] / slice[2]);
+                if (origins[label].indexOf(key.pie.from) < 0) {
+                    origins[label].push(key.pie.from);
+                }
+            });
+        });
+
+        // Same color assignment as plotly.express with color_discrete_map
+        var mapping = Object.assign({}, bundle.color_map);
+        var colors = labels.map(function(label) {
+            if (!(label in mapping)) {
+                mapping[label] = bundle.colorway[Object.keys(mapping).length % bundle.colorway.length];
+            }
+            return mapping[label];
+        });
+
+        return Object.assign({}, bundle.pie_trace, {
+            labels: labels,
+            values: labels.map(function(label) {
+                return values[label];
+            }),
+            hovertext: labels.map(function(label) {
+                return "From: " + origins[label].join(", ") + " → " + label + "<br>" +
+                    grouped(values[label]) + " displaced";
+            }),
+            customdata: labels.map(function(label) {
+                return [label];
+            }),
+            marker: Object.assign({}, bundle.pie_trace.marker, {colors: colors})
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        displacement: {
+            switchWindow: function(value, selections, bundle, mapFigure) {
+                if (!bundle || !value) {
+                    return window.dash_clientside.no_update;
+                }
+                var range = clamp(bundle, value);
+                var first = range[0];
+                var last = range[1];
+                var totals = flowTotals(bundle, first, last, selections);
+                var period = overlapPeriod(bundle, first, last);
+                var names = windowNames(bundle, first, last);
+
+                var updates = mapTraces(bundle, totals);
+                var traces = mapFigure.data.map(function(trace, i) {
+                    var update = updates[i];
+                    var next = Object.assign({}, trace, {lat: update.lat, lon: update.lon});
+                    if (update.text) {
+                        next.text = update.text;
+                        next.marker = Object.assign({}, trace.marker, {size: update.size});
+                    }
+                    return next;
+                });
+                var mapLayout = Object.assign({}, mapFigure.layout, {
+                    title: Object.assign({}, mapFigure.layout.title, {text: names[0]})
+                });
+
+                var pieLayout = Object.assign({}, bundle.pie_layout, {
+                    title: Object.assign({}, bundle.pie_layout.title, {
+                        text: bundle.pie_title.replace("{name}", names[1])
+                    })
+                });
+
+                var outputs = window.dash_clientside.callback_context.outputs_list;
+                var visibility = outputs.slice(3).map(function(sections) {
+                    return sections.map(function(section) {
+                        return {display: section.id.period === period ? "block" : "none"};
+                    });
+                });
+
+                return [
+                    {data: traces, layout: mapLayout},
+                    bundle.periods[period].map_url,
+                    {data: [pieTrace(bundle, totals)], layout: pieLayout}
+                ].concat(visibility);
+            },
+
+            windowLabel: function(value) {
+                return value ? windowLabel(value[0], value[1]) : "";
+            },
+
+            presetWindow: function(clicks, axis) {
+                var triggered = window.dash_clientside.callback_context.triggered;
+                if (!axis || !triggered.length || !triggered[0].value) {
+                    return window.dash_clientside.no_update;
+                }
+                var propId = triggered[0].prop_id;
+                var id = JSON.parse(propId.slice(0, propId.lastIndexOf(".")));
+                return axis.periods[id.period];
+            },
+
+            togglePlayback: function(clicks, disabled) {
+                return [!disabled, disabled ? "Pause" : "Play"];
+            },
+
+            stepWindow: function(ticks, value, axis) {
+                // Slide the window forward a month, wrapping back to the start
+                if (!value || !axis) {
+                    return window.dash_clientside.no_update;
+                }
+                var width = value[1] - value[0];
+                if (value[1] >= axis.last) {
+                    return [axis.first, Math.min(axis.first + width, axis.last)];
+                }
+                return [value[0] + 1, value[1] + 1];
+            }
+        }
+    });
+})();
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.startup import cold_import_times
+from benchmarks.synthetic import synthetic_chunk, write_synthetic_csv
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+DEFAULT_SCALES = [20, 10_000, 1_000_000]
+REFERENCE_PARSE_LIMIT = 1_000_000  # the row-wise reference is too slow beyond this
+
+# -----------------------------
+# HELPERS
+# -----------------------------
+def measure(fn, repeat=5):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return times, result
+
+
+def record(results, name, times, **extra):
+    entry = {
+        "name": name,
+        "seconds_min": min(times),
+        "seconds_median": float(np.median(times)),
+        "runs": len(times),
+    }
+    entry.update(extra)
+    results.append(entry)
+    label = " ".join(f"{k}={v}" for k, v in extra.items())
+    print(f"{name:<28} {entry['seconds_median'] * 1000:10.3f} ms  {label}")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# -----------------------------
+# BENCHMARKS
+# -----------------------------
+def bench_cold_import(results, env, repeat=3):
+    record(results, "cold_import", cold_import_times(env, repeat))
+
+
+def bench_update_dashboard(results, repeat=20):
+    import app
+    from plotly.io.json import to_json_plotly
+
+    for period_key in app.periods:
+        window = app.period_window(period_key)
+        app.render_cache.clear()
+        cold, outputs = measure(lambda: app.update_dashboard(window), repeat=1)
+        warm, _ = measure(lambda: app.update_dashboard(window), repeat=repeat)
+        size = len(to_json_plotly(outputs).encode("utf-8"))
+        record(results, "update_dashboard_cold", cold, period=period_key, response_bytes=size)
+        record(results, "update_dashboard_warm", warm, period=period_key, response_bytes=size)
+
+    bundle = app.build_bundle()
+    times, _ = measure(app.build_bundle, repeat=3)
+    record(results, "build_bundle", times, response_bytes=len(to_json_plotly(bundle).encode("utf-8")))
+
+
+def bench_time_index(results, repeat=20):
+    import app
+    from timeindex import build_time_index
+
+    data = app.current_store()
+    times, index = measure(lambda: build_time_index(data), repeat=3)
+    record(results, "build_time_index", times, keys=len(index.keys), months=index.n_months)
+    # Window totals cost one subtraction per key whatever the window length
+    for months in (1, 12, index.n_months):
+        first = index.first_month
+        times, _ = measure(lambda: index.totals(first, first + months - 1), repeat=repeat)
+        record(results, "time_index_totals", times, months=months)
+
+    # Filters add one lookup per filtered column
+    filters = {column: index.options(column)[:1] for column in app.FILTERS}
+    for n in range(1, len(filters) + 1):
+        selected = dict(list(filters.items())[:n])
+        times, _ = measure(lambda: index.totals(index.first_month, index.last_month, selected), repeat=repeat)
+        record(results, "time_index_filtered_totals", times, filters=n)
+
+
+def bench_parse(results, scales, rng):
+    from ingest import parse_displacement, parse_displacement_column
+
+    for rows in scales:
+        raw = synthetic_chunk(rows, rng)["Number Displaced"]
+        times, _ = measure(lambda: parse_displacement_column(raw), repeat=3)
+        record(results, "parse_displacement_column", times, rows=rows, rows_per_sec=round(rows / min(times)))
+        if rows <= REFERENCE_PARSE_LIMIT:
+            times, _ = measure(lambda: raw.apply(parse_displacement), repeat=1)
+            record(results, "parse_displacement_apply", times, rows=rows, rows_per_sec=round(rows / min(times)))
+
+
+def bench_pie(results, scales, rng):
+    import app
+    from flows import zoom_tiers
+    from flowtable import FlowTable
+    from ingest import normalize_columns
+    from odmatrix import ODMatrix, destination_totals
+
+    for rows in scales:
+        frame = normalize_columns(synthetic_chunk(rows, rng))
+        period_df = frame[frame["Period"] == "1998–1999"]
+        table = FlowTable.from_frame(period_df)
+        times, matrix = measure(lambda: ODMatrix.from_frame(period_df), repeat=3)
+        record(results, "od_matrix", times, rows=len(period_df), cells=len(matrix),
+               rows_per_sec=round(len(period_df) / min(times)))
+        times, _ = measure(lambda: destination_totals(matrix, table), repeat=3)
+        record(results, "destination_totals", times, rows=len(period_df), cells=len(matrix))
+        times, _ = measure(lambda: app.generate_pie_chart(matrix, table, "1998–1999"), repeat=3)
+        record(results, "generate_pie_chart", times, rows=len(period_df), cells=len(matrix))
+        times, _ = measure(lambda: (matrix.top_corridors(10), matrix.net_flow("Croatia", "Serbia")), repeat=3)
+        record(results, "od_queries", times, cells=len(matrix))
+        times, tiers = measure(lambda: zoom_tiers(matrix, table), repeat=3)
+        record(results, "zoom_tiers", times, cells=len(matrix),
+               elements=sum(len(tier["elements"]) for tier in tiers))
+
+
+def bench_map_build(results):
+    try:
+        import build_maps
+    except ImportError as e:
+        print(f"Skipping map build benchmark: {e}")
+        return
+    import app
+
+    tiers = [{"min_zoom": 0, "url": "/maps/benchmark/borders/borders-z0.topo.json"}]
+    data = app.current_store()
+    table = data.flow_table()
+    for period_key in data.periods:
+        period_df = data.partition(period_key)
+        times, _ = measure(lambda: build_period_html(build_maps, period_key, period_df, table, tiers), repeat=3)
+        record(results, "build_period_map", times, period=period_key, rows=len(period_df))
+
+
+def build_period_html(build_maps, period_key, period_df, table, tiers):
+    return build_maps.build_period_map(period_key, period_df, table, tiers).get_root().render()
+
+# -----------------------------
+# COMPARISON
+# -----------------------------
+def _key(entry):
+    params = {k: v for k, v in entry.items()
+              if k not in ("seconds_min", "seconds_median", "runs", "rows_per_sec", "response_bytes")}
+    return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+def compare(baseline_path, results):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_key(entry): entry for entry in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (ratio > 1 is slower):")
+    for entry in results:
+        old = baseline.get(_key(entry))
+        if old and old["seconds_median"] > 0:
+            ratio = entry["seconds_median"] / old["seconds_median"]
+            print(f"{_key(entry):<80} {ratio:6.2f}x")
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard hot paths.")
+    parser.add_argument("--rows", type=int, default=None,
+                        help="serve a synthetic CSV of this many rows instead of the real data")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated row counts for the parse and pie benchmarks")
+    parser.add_argument("--out", default=None, help="write results as JSON to this path")
+    parser.add_argument("--baseline", default=None, help="earlier results JSON to compare against")
+    parser.add_argument("--skip-maps", action="store_true")
+    args = parser.parse_args()
+
+    # The server-side callback is what gets timed; the client bundle is timed separately
+    os.environ["DASHBOARD_CLIENTSIDE"] = "0"
+    if args.rows:
+        tmp_dir = tempfile.mkdtemp(prefix="displacement-bench-")
+        csv_path = write_synthetic_csv(os.path.join(tmp_dir, "synthetic.csv"), args.rows)
+        os.environ["DISPLACEMENT_DATA"] = csv_path
+        os.environ["DISPLACEMENT_STORE"] = os.path.join(tmp_dir, "store")
+
+    rng = np.random.default_rng(0)
+    scales = [int(s) for s in args.scales.split(",") if s]
+    results = []
+
+    bench_cold_import(results, dict(os.environ))
+    bench_update_dashboard(results)
+    bench_time_index(results)
+    bench_parse(results, scales, rng)
+    bench_pie(results, scales, rng)
+    if not args.skip_maps:
+        bench_map_build(results)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "rows": args.rows,
+            "scales": scales,
+        },
+        "results": results,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nSaved: {args.out}")
+    if args.baseline:
+        compare(args.baseline, results)
+
+
+if __name__ == "__main__":
+    main()
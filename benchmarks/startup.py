@@ -0,0 +1,36 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+# Importing app.py must stay cheap: scale-to-zero instances pay for it on the
+# first request. Data, charts and narrative content are built lazily.
+DEFAULT_BUDGET = float(os.environ.get("STARTUP_BUDGET_SECONDS", 1.5))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def cold_import_times(env=None, repeat=3):
+    times = []
+    for _ in range(repeat):
+        out = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], env=env, text=True)
+        times.append(float(out.strip().splitlines()[-1]))
+    return times
+
+# -----------------------------
+# CLI
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if importing app.py exceeds the startup-time budget.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds (median of runs)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    times = cold_import_times(repeat=args.repeat)
+    median = statistics.median(times)
+    print(f"import app: median {median:.3f}s over {len(times)} runs (budget {args.budget:.3f}s)")
+    if median > args.budget:
+        sys.exit(f"Startup budget exceeded by {median - args.budget:.3f}s")
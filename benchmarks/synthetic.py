@@ -0,0 +1,78 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from geography import country_coords
+
+# -----------------------------
+# SCHEMA
+# -----------------------------
+# Same columns and value formats as data/Yugoslav_War_Data.csv: plain counts,
+# comma-grouped counts and en-dash ranges in Number Displaced.
+COLUMNS = ["Period", "Origin Country", "Destination Country", "Type", "Number Displaced", "Conflict", "Source"]
+PERIOD_CONFLICTS = {
+    "1991–1992": ["Croatian War"],
+    "1992–1995": ["Bosnian War"],
+    "1998–1999": ["Kosovo War", "Post-Kosovo War"],
+}
+ORIGINS = ["Croatia", "Bosnia and Herzegovina", "Kosovo", "Serbia and Montenegro"]
+DESTINATIONS = [place for place in country_coords if place != "Croatia and Bosnia"]
+SOURCES = ["UNHCR", "IDMC", "ICRC"]
+CHUNK_ROWS = 1_000_000
+
+
+def synthetic_chunk(rows, rng):
+    periods = list(PERIOD_CONFLICTS)
+    period = rng.choice(periods, rows)
+    conflict = np.empty(rows, dtype=object)
+    for p, names in PERIOD_CONFLICTS.items():
+        mask = period == p
+        conflict[mask] = rng.choice(names, mask.sum())
+
+    destination = rng.choice(DESTINATIONS, rows)
+    is_internal = np.char.endswith(destination.astype(str), "(internal)")
+
+    counts = rng.lognormal(mean=9, sigma=1.5, size=rows).astype(np.int64) + 1
+    text = counts.astype(str).astype(object)
+    style = rng.random(rows)
+    grouped = style < 0.3
+    text[grouped] = [f"{n:,}" for n in counts[grouped]]
+    ranged = style > 0.9
+    text[ranged] = [f"{n:,}–{n + n // 10:,}" for n in counts[ranged]]
+
+    return pd.DataFrame({
+        "Period": period,
+        "Origin Country": rng.choice(ORIGINS, rows),
+        "Destination Country": destination,
+        "Type": np.where(is_internal, "IDPs", "Refugees"),
+        "Number Displaced": text,
+        "Conflict": conflict,
+        "Source": rng.choice(SOURCES, rows),
+    }, columns=COLUMNS)
+
+
+def write_synthetic_csv(path, rows, seed=0, chunk_rows=CHUNK_ROWS):
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    written = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        while written < rows:
+            n = min(chunk_rows, rows - written)
+            synthetic_chunk(n, rng).to_csv(f, index=False, header=written == 0)
+            written += n
+    return path
+
+# -----------------------------
+# CLI
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic displacement CSV with the Yugoslav_War_Data.csv schema.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--out", default="bench_data/synthetic.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    write_synthetic_csv(args.out, args.rows, args.seed)
+    print(f"Saved: {args.out} ({args.rows:,} rows)")
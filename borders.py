@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+
+import numpy as np
+
+from map_assets import content_hash
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+QUANTIZATION = 100_000
+OBJECT_NAME = "borders"
+KEEP_PROPERTIES = ["admin", "name"]
+
+# (min_zoom, tolerance in degrees); each tier is used from min_zoom upwards
+DETAIL_TIERS = [
+    (0, 0.05),
+    (5, 0.01),
+    (7, 0.002),
+]
+
+# -----------------------------
+# TOPOLOGY
+# -----------------------------
+# Rings are quantized onto an integer grid, cut at junctions (points where
+# neighbouring rings stop sharing a boundary) and deduplicated, so a border
+# shared by two countries is stored and simplified exactly once and the
+# simplified polygons still meet without gaps.
+def _polygons(geometry):
+    if geometry is None:
+        return []
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return []
+
+
+def _quantize(features):
+    coords = np.array([point[:2]
+                       for feature in features
+                       for polygon in _polygons(feature["geometry"])
+                       for ring in polygon
+                       for point in ring], dtype=float)
+    x0, y0 = coords.min(axis=0)
+    x1, y1 = coords.max(axis=0)
+    kx = (x1 - x0) / (QUANTIZATION - 1) or 1
+    ky = (y1 - y0) / (QUANTIZATION - 1) or 1
+
+    def quantize_ring(ring):
+        points = np.rint((np.asarray(ring, dtype=float)[:, :2] - (x0, y0)) / (kx, ky)).astype(np.int64)
+        keep = np.ones(len(points), dtype=bool)
+        keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+        points = [tuple(p) for p in points[keep]]
+        if points[0] != points[-1]:
+            points.append(points[0])
+        return points
+
+    transform = {"scale": [kx, ky], "translate": [x0, y0]}
+    return quantize_ring, transform
+
+
+def _find_junctions(rings):
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        points = ring[:-1]
+        n = len(points)
+        for i, point in enumerate(points):
+            pair = frozenset((points[i - 1], points[(i + 1) % n]))
+            if neighbours.setdefault(point, pair) != pair:
+                junctions.add(point)
+    return junctions
+
+
+def _cut_ring(ring, junctions):
+    points = ring[:-1]
+    cuts = [i for i, point in enumerate(points) if point in junctions]
+    if not cuts:
+        # Closed arc with no junctions: rotate to a canonical start for dedupe
+        start = points.index(min(points))
+        rotated = points[start:] + points[:start]
+        return [rotated + [rotated[0]]]
+
+    rotated = points[cuts[0]:] + points[:cuts[0]]
+    rotated.append(rotated[0])
+    offsets = [i - cuts[0] for i in cuts] + [len(points)]
+    return [rotated[a:b + 1] for a, b in zip(offsets, offsets[1:])]
+
+
+def build_topology(geojson, property_function=None):
+    features = geojson["features"]
+    quantize_ring, transform = _quantize(features)
+
+    shapes = []  # per feature: list of polygons, each a list of rings
+    for feature in features:
+        shapes.append([[quantize_ring(ring) for ring in polygon]
+                       for polygon in _polygons(feature["geometry"])])
+    junctions = _find_junctions(ring for polygons in shapes for polygon in polygons for ring in polygon)
+
+    arcs, arc_index = [], {}
+
+    def arc_id(points):
+        key = tuple(points)
+        if key in arc_index:
+            return arc_index[key]
+        reverse = key[::-1]
+        if reverse in arc_index:
+            return ~arc_index[reverse]
+        arc_index[key] = len(arcs)
+        arcs.append(np.array(points, dtype=np.int64))
+        return arc_index[key]
+
+    geometries = []
+    for feature, polygons in zip(features, shapes):
+        props = {key: feature["properties"].get(key) for key in KEEP_PROPERTIES
+                 if key in feature["properties"]}
+        if property_function is not None:
+            props.update(property_function(feature))
+        geometry_arcs = [[[arc_id(piece) for piece in _cut_ring(ring, junctions)] for ring in polygon]
+                         for polygon in polygons]
+        geometries.append({"type": "MultiPolygon", "arcs": geometry_arcs, "properties": props})
+
+    return {"transform": transform, "arcs": arcs, "geometries": geometries}
+
+# -----------------------------
+# SIMPLIFICATION
+# -----------------------------
+def _douglas_peucker(points, tolerance):
+    if len(points) <= 2:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    pts = points.astype(float)
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        seg = pts[b] - pts[a]
+        rel = pts[a + 1:b] - pts[a]
+        length = np.hypot(*seg)
+        if length == 0:
+            dist = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = a + 1 + i
+            keep[mid] = True
+            stack.append((a, mid))
+            stack.append((mid, b))
+    return points[keep]
+
+
+def _keep_farthest(points, simplified):
+    # A half ring simplified to its two ends keeps its point farthest from
+    # them, so a closed arc never collapses below 4 distinct points
+    if len(simplified) > 2 or len(points) < 3:
+        return simplified
+    seg = (points[-1] - points[0]).astype(float)
+    rel = (points[1:-1] - points[0]).astype(float)
+    length = np.hypot(*seg)
+    dist = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / length if length else np.hypot(rel[:, 0], rel[:, 1])
+    return np.vstack([points[:1], points[1 + int(np.argmax(dist))], points[-1:]])
+
+
+def simplify_arc(points, tolerance):
+    if len(points) > 3 and tuple(points[0]) == tuple(points[-1]):
+        # Closed arcs: split at the farthest point so the ring keeps its area
+        far = int(np.argmax(np.hypot(*(points - points[0]).T)))
+        head = _keep_farthest(points[:far + 1], _douglas_peucker(points[:far + 1], tolerance))
+        tail = _keep_farthest(points[far:], _douglas_peucker(points[far:], tolerance))
+        return np.vstack([head, tail[1:]])
+    return _douglas_peucker(points, tolerance)
+
+
+def to_topojson(topology, tolerance):
+    kx, ky = topology["transform"]["scale"]
+    tolerance_units = tolerance / max(kx, ky)
+    arcs = []
+    for points in topology["arcs"]:
+        simplified = simplify_arc(points, tolerance_units)
+        deltas = np.vstack([simplified[:1], np.diff(simplified, axis=0)])
+        arcs.append(deltas.tolist())
+    return {
+        "type": "Topology",
+        "transform": topology["transform"],
+        "objects": {OBJECT_NAME: {"type": "GeometryCollection", "geometries": topology["geometries"]}},
+        "arcs": arcs,
+    }
+
+# -----------------------------
+# PUBLISH
+# -----------------------------
+def _same_content(path, data):
+    try:
+        with open(path, "rb") as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+
+def publish_borders(geojson_path, out_dir, property_function=None, tiers=DETAIL_TIERS):
+    with open(geojson_path, "r", encoding="utf-8") as f:
+        topology = build_topology(json.load(f), property_function)
+
+    os.makedirs(out_dir, exist_ok=True)
+    published = []
+    for min_zoom, tolerance in tiers:
+        data = json.dumps(to_topojson(topology, tolerance), separators=(",", ":")).encode("utf-8")
+        path = os.path.join(out_dir, f"borders-z{min_zoom}.topo.json")
+        if not _same_content(path, data):
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        published.append({"min_zoom": min_zoom, "path": path, "hash": content_hash(data), "bytes": len(data)})
+    return published
+
+# -----------------------------
+# CLI
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize and simplify the borders GeoJSON into shared TopoJSON tiers.")
+    parser.add_argument("geojson", nargs="?", default="data/1custom.geo.json")
+    parser.add_argument("--out", default="maps/borders")
+    args = parser.parse_args()
+
+    for tier in publish_borders(args.geojson, args.out):
+        print(f"Saved: {tier['path']} (zoom >= {tier['min_zoom']}, {tier['bytes']:,} bytes)")
@@ -0,0 +1,348 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import folium
+import pandas as pd
+from branca.element import MacroElement, Template
+from folium.elements import JSCSSMixin
+from folium.map import Layer
+from folium.plugins import AntPath
+
+from borders import publish_borders
+from datastore import DEFAULT_STORE_DIR, open_store
+from flows import zoom_tiers
+from geography import disaggregation_rules, style, yugoslav_republics
+from map_assets import URL_PREFIX
+from odmatrix import ODMatrix
+from places import gazetteer
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+# Bump when the rendering code below changes in a way that alters output
+BUILD_VERSION = 3
+
+DATA_PATH = "data/Yugoslav_War_Data.csv"
+BORDERS_PATH = "data/1custom.geo.json"
+MAPS_DIR = "maps"
+BORDERS_DIR = "borders"
+BUILD_MANIFEST = "build-manifest.json"
+
+def border_style(feature):
+    inside = feature['properties']['admin'] in yugoslav_republics
+    return {
+        'fillOpacity': 0.3 if inside else 0,
+        'fillColor': '#555555' if inside else 'transparent',
+        'color': 'black' if inside else 'gray',
+        'weight': 2 if inside else 1
+    }
+
+# LEGEND HTML
+legend_html = """
+<div style="
+    position: fixed;
+    bottom: 20px;
+    left: 20px;
+    z-index: 9999;
+    background-color: white;
+    padding: 10px;
+    border: 2px solid gray;
+    font-size: 14px;
+">
+<b>Legend</b><br>
+<span style="color:red;">&#9679;</span> Origin<br>
+<span style="color:green;">&#9679;</span> Destination<br>
+<span style="color:orange;">&#9679;</span> Internal displacement<br>
+<span style="color:blue;">&#8594;</span> Refugee flow<br>
+</div>
+"""
+
+# PERIOD TITLES & DESCRIPTIONS
+period_titles = {
+    "1991–1992": "Displacement During the Croatian War (1991–1992)",
+    "1992–1995": "Displacement During the Bosnian War (1992–1995)",
+    "1998–1999": "Displacement During the Kosovo War (1998–1999)"
+}
+
+period_descriptions = {
+    "1991–1992": (
+        "This map visualizes refugee and internal displacement patterns during the Croatian War. "
+        "Large population movements occurred due to ethnic violence following Croatia’s declaration of independence."
+    ),
+    "1992–1995": (
+        "This map captures the mass displacements of the Bosnian War, which involved ethnic cleansing, "
+        "sieges, and forced migration across the Balkans. Bosnia and Herzegovina saw the largest internal displacements."
+    ),
+    "1998–1999": (
+        "This map shows displacement from the Kosovo War, where ethnic Albanians were expelled en masse by Serbian forces. "
+        "Refugees fled into neighboring Albania, Macedonia, and beyond."
+    )
+}
+
+def map_filename(period):
+    safe_period = period.replace("–", "_").replace(" ", "")
+    return f"displacement_map_{safe_period}.html"
+
+# -----------------------------
+# CONTENT HASHES
+# -----------------------------
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def settings_digest(border_tiers):
+    settings = json.dumps({
+        "version": BUILD_VERSION,
+        "places": gazetteer().signature(),
+        "yugoslav_republics": yugoslav_republics,
+        "disaggregation_rules": disaggregation_rules,
+        "style": style,
+        "legend": legend_html,
+        "borders": border_tiers,
+    }, sort_keys=True, ensure_ascii=False)
+    return _digest(settings)
+
+
+def period_digest(period, data, shared_digest):
+    rows = pd.util.hash_pandas_object(data, index=False).to_numpy().tobytes()
+    text = json.dumps([period_titles.get(period), period_descriptions.get(period)], ensure_ascii=False)
+    return _digest(shared_digest, period, text, rows)
+
+# -----------------------------
+# RENDERING
+# -----------------------------
+# Borders are published once as shared TopoJSON tiers with their style baked
+# into feature properties; each map only references them by URL and loads
+# the tier matching the current zoom level.
+def _border_properties(feature):
+    return {"style": border_style(feature)}
+
+
+def publish_border_tiers(borders_path, maps_dir):
+    tiers = publish_borders(borders_path, os.path.join(maps_dir, BORDERS_DIR), _border_properties)
+    return [{"min_zoom": tier["min_zoom"],
+             "url": f"{URL_PREFIX}/{tier['hash']}/{BORDERS_DIR}/{os.path.basename(tier['path'])}"}
+            for tier in tiers]
+
+
+class TieredBorders(JSCSSMixin, Layer):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.geoJson(null, {
+                style: function(feature) { return feature.properties.style; }
+            }).addTo({{ this._parent.get_name() }});
+            (function(map, layer, tiers) {
+                var loaded = {}, current = null;
+                function show() {
+                    var tier = tiers[0];
+                    tiers.forEach(function(t) { if (map.getZoom() >= t.min_zoom) { tier = t; } });
+                    if (tier === current) { return; }
+                    current = tier;
+                    loaded[tier.url] = loaded[tier.url] || fetch(tier.url)
+                        .then(function(r) { return r.json(); })
+                        .then(function(topo) { return topojson.feature(topo, topo.objects.borders); });
+                    loaded[tier.url].then(function(features) {
+                        if (current !== tier) { return; }
+                        layer.clearLayers();
+                        layer.addData(features);
+                    });
+                }
+                map.on("zoomend", show);
+                show();
+            })({{ this._parent.get_name() }}, {{ this.get_name() }}, {{ this.tiers|tojson }});
+        {% endmacro %}
+    """)
+    default_js = [("topojson-client", "https://cdn.jsdelivr.net/npm/topojson-client@3/dist/topojson-client.min.js")]
+
+    def __init__(self, tiers, name=None):
+        super().__init__(name=name)
+        self._name = "TieredBorders"
+        self.tiers = tiers
+
+
+# Flows are drawn per zoom tier (flows.zoom_tiers), each tier's lines and
+# markers in their own feature groups that are only on the map within the
+# tier's zoom range. Markers are kept above the lines of every tier.
+class ZoomLayers(MacroElement):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            (function(map, tiers) {
+                function show() {
+                    var zoom = map.getZoom();
+                    tiers.forEach(function(tier) {
+                        var visible = (tier.min_zoom === null || zoom >= tier.min_zoom) &&
+                                      (tier.max_zoom === null || zoom < tier.max_zoom);
+                        if (visible) { map.addLayer(tier.layer); } else { map.removeLayer(tier.layer); }
+                    });
+                    tiers.forEach(function(tier) {
+                        if (tier.front && map.hasLayer(tier.layer)) { tier.layer.bringToFront(); }
+                    });
+                }
+                map.on("zoomend", show);
+                show();
+            })({{ this._parent.get_name() }}, [
+                {%- for tier in this.tiers %}
+                {layer: {{ tier.layer.get_name() }}, front: {{ tier.front|tojson }},
+                 min_zoom: {{ tier.min_zoom|tojson }}, max_zoom: {{ tier.max_zoom|tojson }}},
+                {%- endfor %}
+            ]);
+        {% endmacro %}
+    """)
+
+    def __init__(self, tiers):
+        super().__init__()
+        self._name = "ZoomLayers"
+        self.tiers = tiers
+
+
+def build_period_map(period, data, table, border_tiers):
+    m = folium.Map(location=style["center"], zoom_start=style["zoom_start"])
+
+    TieredBorders(border_tiers, name="European Borders").add_to(m)
+
+    colors = {"origin": style["origin_color"], "destination": style["destination_color"],
+              "internal": style["internal_color"]}
+    layers = []
+    for tier in zoom_tiers(ODMatrix.from_frame(data), table):
+        lines = folium.FeatureGroup(control=False, show=False).add_to(m)
+        markers = folium.FeatureGroup(control=False, show=False).add_to(m)
+        for element in tier["elements"]:
+            if element["shape"] == "line":
+                AntPath(element["path"], color=style["flow_color"], weight=element["weight"]).add_to(lines)
+            else:
+                folium.CircleMarker(element["location"], radius=element["radius"],
+                                    color=colors[element["kind"]], fill=True, fill_opacity=0.8,
+                                    popup=element["popup"]).add_to(markers)
+        layers += [{"layer": lines, "front": False, **tier}, {"layer": markers, "front": True, **tier}]
+    ZoomLayers(layers).add_to(m)
+
+    # ADD LEGEND, TITLE, SIDEBAR
+    folium.LayerControl().add_to(m)
+
+    # >>>> TITLE
+    title_text = period_titles.get(period, f"Displacement Map: {period}")
+    title_html = f"""
+    <h3 style='position: fixed; top: 10px; left: 50%; transform: translateX(-50%);
+         z-index:9999; background-color: white; padding: 10px; border: 2px solid gray;
+         font-size: 20px;'>
+    {title_text}
+    </h3>
+    """
+    m.get_root().html.add_child(folium.Element(title_html))
+
+    # >>>> SIDEBAR
+    desc_text = period_descriptions.get(period, "")
+    sidebar_html = f"""
+    <div style="
+        position: fixed;
+        top: 80px;
+        right: 20px;
+        width: 300px;
+        max-height: 500px;
+        overflow-y: auto;
+        z-index: 9999;
+        background-color: white;
+        padding: 15px;
+        border: 2px solid gray;
+        font-size: 14px;
+    ">
+    <h4>Description</h4>
+    <p>{desc_text}</p>
+    <ul>
+        <li><b>Red dots</b>: Origin (total externally displaced)</li>
+        <li><b>Green dots</b>: Destination</li>
+        <li><b>Orange dots</b>: Internal displacement</li>
+        <li><b>Blue lines</b>: Flow direction</li>
+    </ul>
+    </div>
+    """
+    m.get_root().html.add_child(folium.Element(sidebar_html))
+
+    m.get_root().html.add_child(folium.Element(legend_html))
+    return m
+
+
+def render_to_file(period, data, table, border_tiers, out_path):
+    started = time.perf_counter()
+    m = build_period_map(period, data, table, border_tiers)
+
+    # Write next to the target and rename, so the app never serves a partial file
+    tmp_path = os.path.join(os.path.dirname(out_path), f".{os.path.basename(out_path)}.tmp{os.getpid()}")
+    m.save(tmp_path)
+    os.replace(tmp_path, out_path)
+    return period, time.perf_counter() - started
+
+# -----------------------------
+# BUILD
+# -----------------------------
+def _read_manifest(maps_dir):
+    try:
+        with open(os.path.join(maps_dir, BUILD_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_manifest(maps_dir, manifest):
+    path = os.path.join(maps_dir, BUILD_MANIFEST)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def build_maps(csv_path=DATA_PATH, borders_path=BORDERS_PATH, maps_dir=MAPS_DIR,
+               store_dir=DEFAULT_STORE_DIR, workers=None, force=False):
+    os.makedirs(maps_dir, exist_ok=True)
+    store = open_store(csv_path, store_dir)
+    table = store.flow_table()
+    border_tiers = publish_border_tiers(borders_path, maps_dir)
+    shared_digest = settings_digest(border_tiers)
+    manifest = _read_manifest(maps_dir)
+
+    jobs = {}
+    for period in store.periods:
+        data = store.partition(period)
+        digest = period_digest(period, data, shared_digest)
+        out_path = os.path.join(maps_dir, map_filename(period))
+        if not force and manifest.get(period) == digest and os.path.exists(out_path):
+            print(f"Unchanged: {out_path}")
+            continue
+        jobs[period] = (digest, data, out_path)
+
+    if not jobs:
+        return manifest
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(render_to_file, period, pd.DataFrame(data), table, border_tiers, out_path)
+                   for period, (_, data, out_path) in jobs.items()]
+        for future in as_completed(futures):
+            period, elapsed = future.result()
+            manifest[period] = jobs[period][0]
+            _write_manifest(maps_dir, manifest)
+            print(f"Saved: {jobs[period][2]} ({elapsed:.2f}s)")
+
+    return manifest
+
+# -----------------------------
+# CLI
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the per-period folium displacement maps.")
+    parser.add_argument("csv", nargs="?", default=DATA_PATH)
+    parser.add_argument("--borders", default=BORDERS_PATH, help="European borders GeoJSON")
+    parser.add_argument("--out", default=MAPS_DIR)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="re-render every period")
+    args = parser.parse_args()
+
+    build_maps(args.csv, args.borders, args.out, args.store, args.workers, args.force)
@@ -0,0 +1,313 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from flowtable import FlowTable, rules_signature
+from ingest import CATEGORY_COLUMNS, parse_displacement_column
+from render_cache import file_signature
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+DEFAULT_STORE_DIR = "data/store"
+CHUNK_SIZE = 250_000
+MANIFEST = "manifest.json"
+FLOW_TABLE = "flows.json"
+KEY_COLUMNS = ["Origin_Country", "Destination_Country", "Type"]
+VALUE_COLUMN = "Number_Displaced"
+VALUE_DTYPE = "int32"
+CODE_DTYPE = "int32"
+
+# -----------------------------
+# BUILD
+# -----------------------------
+# Streams the CSV in chunks and appends each chunk's rows to one raw column
+# file per Period partition. String columns are stored as int32 codes into
+# dictionaries kept in the manifest, so memory stays bounded by the chunk
+# size no matter how large the CSV is.
+def build_store(csv_path, store_dir=DEFAULT_STORE_DIR, chunksize=CHUNK_SIZE):
+    tmp_dir = f"{store_dir}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    dictionaries = {column: {} for column in CATEGORY_COLUMNS}
+    partitions = {}  # period -> {"dir", "rows"}
+
+    columns = list(pd.read_csv(csv_path, nrows=0).columns)
+    with open(csv_path, "rb") as f:
+        _ingest(pd.read_csv(f, dtype=str, chunksize=chunksize), tmp_dir, dictionaries, partitions)
+        consumed = f.tell()
+
+    manifest = {
+        # A new generation on every full build; appends keep it
+        "generation": os.urandom(8).hex(),
+        "columns": columns,
+        "value_dtype": VALUE_DTYPE,
+        "code_dtype": CODE_DTYPE,
+        "dictionaries": {column: list(values) for column, values in dictionaries.items()},
+        "partitions": partitions,
+    }
+    _write_manifest(tmp_dir, manifest, csv_path, consumed)
+    PartitionedStore(tmp_dir).flow_table()
+
+    # Swap the finished store into place so readers never see a partial build
+    old_dir = f"{store_dir}.old{os.getpid()}"
+    if os.path.exists(store_dir):
+        os.replace(store_dir, old_dir)
+    os.replace(tmp_dir, store_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+# -----------------------------
+# APPEND
+# -----------------------------
+# When rows were only added to the end of the CSV (the bytes the store was
+# built from are unchanged), just the new rows are parsed and appended to the
+# partition files. Readers keep seeing the old row counts until the manifest
+# is replaced.
+def append_store(csv_path, store_dir=DEFAULT_STORE_DIR, chunksize=CHUNK_SIZE):
+    # False when the CSV changed in any other way and needs a full build
+    with open(os.path.join(store_dir, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    consumed = manifest.get("consumed_bytes")
+    if consumed is None or os.path.getsize(csv_path) < consumed:
+        return False
+    if _prefix_digest(csv_path, consumed) != manifest["prefix_sha256"]:
+        return False
+
+    # Drop anything an interrupted append left past the recorded rows
+    partitions = manifest["partitions"]
+    dtypes = {column: manifest["code_dtype"] for column in CATEGORY_COLUMNS}
+    dtypes[VALUE_COLUMN] = manifest["value_dtype"]
+    for part in partitions.values():
+        for column, dtype in dtypes.items():
+            path = os.path.join(store_dir, part["dir"], f"{column}.bin")
+            if os.path.exists(path):
+                os.truncate(path, part["rows"] * np.dtype(dtype).itemsize)
+
+    dictionaries = {column: {name: code for code, name in enumerate(values)}
+                    for column, values in manifest["dictionaries"].items()}
+    with open(csv_path, "rb") as f:
+        f.seek(consumed)
+        try:
+            reader = pd.read_csv(f, dtype=str, chunksize=chunksize, header=None, names=manifest["columns"])
+            _ingest(reader, store_dir, dictionaries, partitions)
+        except pd.errors.EmptyDataError:
+            pass
+        consumed = f.tell()
+
+    manifest["dictionaries"] = {column: list(values) for column, values in dictionaries.items()}
+    _write_manifest(store_dir, manifest, csv_path, consumed)
+    return True
+
+
+def _ingest(reader, store_dir, dictionaries, partitions):
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip().str.replace(" ", "_")
+        columns = {VALUE_COLUMN: parse_displacement_column(chunk[VALUE_COLUMN]).to_numpy()}
+        if columns[VALUE_COLUMN].dtype != np.dtype(VALUE_DTYPE):
+            raise ValueError(f"{VALUE_COLUMN} does not fit in {VALUE_DTYPE}")
+        for column in CATEGORY_COLUMNS:
+            columns[column] = _encode(chunk[column], dictionaries[column])
+
+        period_codes = columns["Period"]
+        period_names = list(dictionaries["Period"])
+        for code in np.unique(period_codes[period_codes >= 0]):
+            period = period_names[code]
+            rows = period_codes == code
+            part = partitions.setdefault(period, {"dir": f"p{len(partitions):05d}", "rows": 0})
+            part_dir = os.path.join(store_dir, part["dir"])
+            os.makedirs(part_dir, exist_ok=True)
+            for column, values in columns.items():
+                with open(os.path.join(part_dir, f"{column}.bin"), "ab") as f:
+                    values[rows].tofile(f)
+            part["rows"] += int(rows.sum())
+
+
+def _write_manifest(store_dir, manifest, csv_path, consumed):
+    manifest["source"] = list(file_signature(csv_path))
+    manifest["consumed_bytes"] = consumed
+    manifest["prefix_sha256"] = _prefix_digest(csv_path, consumed)
+    path = os.path.join(store_dir, MANIFEST)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _prefix_digest(path, length):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while length > 0:
+            block = f.read(min(length, 1 << 20))
+            if not block:
+                break
+            h.update(block)
+            length -= len(block)
+    return h.hexdigest()
+
+
+def _encode(values, dictionary):
+    codes, uniques = pd.factorize(values)
+    mapping = np.empty(len(uniques) + 1, dtype=CODE_DTYPE)
+    for i, name in enumerate(uniques):
+        mapping[i] = dictionary.setdefault(str(name), len(dictionary))
+    mapping[-1] = -1  # missing values
+    return mapping[codes]
+
+# -----------------------------
+# READ
+# -----------------------------
+class PartitionedStore:
+    def __init__(self, store_dir=DEFAULT_STORE_DIR):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.categories = {column: pd.Index(values, dtype=object)
+                           for column, values in self.manifest["dictionaries"].items()}
+        self._flow_table = None
+
+    @property
+    def source_signature(self):
+        return tuple(self.manifest["source"])
+
+    @property
+    def generation(self):
+        return self.manifest["generation"]
+
+    @property
+    def periods(self):
+        return list(self.manifest["partitions"])
+
+    def partition(self, period, start=0, stop=None):
+        # Rows start:stop, e.g. only those appended since an earlier read or
+        # one chunk of an export
+        part = self.manifest["partitions"].get(period)
+        if part is None or start >= part["rows"]:
+            return self._empty_frame()
+
+        part_dir = os.path.join(self.store_dir, part["dir"])
+        data = {}
+        for column in CATEGORY_COLUMNS:
+            codes = self._column(part_dir, column, self.manifest["code_dtype"], part["rows"])[start:stop]
+            data[column] = pd.Categorical.from_codes(codes, categories=self.categories[column])
+        data[VALUE_COLUMN] = self._column(part_dir, VALUE_COLUMN, self.manifest["value_dtype"], part["rows"])[start:stop]
+        return pd.DataFrame(data)
+
+    def flow_table(self):
+        # Disaggregated rows for every distinct key, read from flows.json and
+        # rebuilt there when the store is rebuilt or the rules have changed.
+        # Keys that only appear in appended rows are expanded on first use.
+        if self._flow_table is None:
+            path = os.path.join(self.store_dir, FLOW_TABLE)
+            signature = [self.generation, rules_signature()]
+            self._flow_table = FlowTable.load(path, signature)
+            if self._flow_table is None:
+                self._flow_table = FlowTable.from_keys(self.keys())
+                self._flow_table.save(path, signature)
+        return self._flow_table
+
+    def keys(self):
+        # Distinct (origin, destination, type) names, in order of appearance
+        seen = {}
+        for period in self.periods:
+            part = self.manifest["partitions"][period]
+            part_dir = os.path.join(self.store_dir, part["dir"])
+            codes = [self._column(part_dir, column, self.manifest["code_dtype"], part["rows"])
+                     for column in KEY_COLUMNS]
+            complete = np.logical_and.reduce([c >= 0 for c in codes])
+            unique = pd.MultiIndex.from_arrays([c[complete] for c in codes]).unique()
+            for key in unique:
+                seen.setdefault(tuple(self.categories[column][code] for column, code in zip(KEY_COLUMNS, key)), None)
+        return list(seen)
+
+    def frame(self):
+        frames = [self.partition(period) for period in self.periods]
+        return pd.concat(frames, ignore_index=True) if frames else self._empty_frame()
+
+    def _column(self, part_dir, column, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(part_dir, f"{column}.bin"), dtype=dtype, mode="r", shape=(rows,))
+
+    def _empty_frame(self):
+        data = {column: pd.Categorical.from_codes([], categories=self.categories[column])
+                for column in CATEGORY_COLUMNS}
+        data[VALUE_COLUMN] = np.empty(0, dtype=self.manifest["value_dtype"])
+        return pd.DataFrame(data)
+
+
+def open_store(csv_path, store_dir=DEFAULT_STORE_DIR):
+    # Rebuild only when the CSV has changed since the store was written, and
+    # only ingest the new rows when it has just grown
+    store = _current_store(csv_path, store_dir)
+    if store is not None:
+        return store
+    with _store_lock(store_dir):
+        # Another process may have brought the store up to date meanwhile
+        store = _current_store(csv_path, store_dir)
+        if store is not None:
+            return store
+        if not os.path.exists(os.path.join(store_dir, MANIFEST)) or not _try_append(csv_path, store_dir):
+            build_store(csv_path, store_dir)
+    return PartitionedStore(store_dir)
+
+
+def _current_store(csv_path, store_dir):
+    try:
+        store = PartitionedStore(store_dir)
+        if store.source_signature == file_signature(csv_path) and "generation" in store.manifest:
+            return store
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+    return None
+
+
+def _try_append(csv_path, store_dir):
+    try:
+        return append_store(csv_path, store_dir)
+    except (json.JSONDecodeError, KeyError):
+        return False
+
+
+@contextmanager
+def _store_lock(store_dir):
+    # Serializes builds and appends across gunicorn workers
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(store_dir)), exist_ok=True)
+    with open(f"{store_dir}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+# -----------------------------
+# CLI
+# -----------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the Period-partitioned displacement store.")
+    parser.add_argument("csv", nargs="?", default="data/Yugoslav_War_Data.csv")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--append", action="store_true", help="only ingest rows added since the last build")
+    args = parser.parse_args()
+
+    appendable = args.append and os.path.exists(os.path.join(args.store, MANIFEST))
+    if not (appendable and append_store(args.csv, args.store, args.chunksize)):
+        build_store(args.csv, args.store, args.chunksize)
+    store = PartitionedStore(args.store)
+    for period, part in store.manifest["partitions"].items():
+        print(f"{period}: {part['rows']:,} rows")
@@ -0,0 +1,274 @@
+import hashlib
+import importlib.util
+import json
+import zlib
+
+from flask import Response, abort, request
+
+from flowtable import rules_signature
+from places import gazetteer
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+URL_PREFIX = "/export"
+EXPORT_VERSION = 1
+CHUNK_ROWS = 100_000
+# Features serialized per write, so a GeoJSON chunk is never held whole
+GEOJSON_BATCH = 5_000
+FORMATS = {
+    "csv": "text/csv",
+    "geojson": "application/geo+json",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Query parameter -> store column; repeat a parameter to select several values
+FILTER_PARAMS = {"period": "Period", "type": "Type", "origin": "Origin_Country"}
+
+TEXT_COLUMNS = ["Period", "Origin_Country", "Destination_Country", "Target", "Type", "Conflict", "Source"]
+INT_COLUMNS = ["Number_Displaced", "Displaced_Share"]
+FLOAT_COLUMNS = ["Origin_Lat", "Origin_Lon", "Target_Lat", "Target_Lon"]
+COLUMNS = TEXT_COLUMNS[:4] + ["Internal"] + TEXT_COLUMNS[4:] + INT_COLUMNS + FLOAT_COLUMNS
+
+# Set by init_app: returns the current PartitionedStore
+_current_store = None
+
+# -----------------------------
+# ROWS
+# -----------------------------
+# The cleaned rows of the store with each one expanded into its flow-table
+# targets (aggregate destinations become their parts, each with its share of
+# the count and the coordinates of its origin and target place). Partitions
+# are read CHUNK_ROWS at a time from the memory-mapped columns, so memory
+# stays flat however large the store is.
+def export_frames(store, filters, chunk_rows=CHUNK_ROWS):
+    import numpy as np
+    from timeindex import selection_table
+
+    table = store.flow_table()
+    selected = {column: selection_table(store.categories[column], names)
+                for column, names in filters.items() if names and column != "Period"}
+    periods = [period for period in store.periods
+               if not filters.get("Period") or period in filters["Period"]]
+
+    for period in periods:
+        rows = store.manifest["partitions"][period]["rows"]
+        for start in range(0, rows, chunk_rows):
+            data = store.partition(period, start, start + chunk_rows)
+            keep = np.ones(len(data), dtype=bool)
+            for column, allowed in selected.items():
+                keep &= allowed[data[column].cat.codes.to_numpy()]
+            if not keep.all():
+                data = data[keep]
+            if len(data):
+                yield _expand(data, table)
+
+
+def _names(column):
+    # Category names by code, with "" for missing values at code -1
+    import numpy as np
+
+    return np.append(column.cat.categories.to_numpy(dtype=object).astype(str), "")
+
+
+def _expand(data, table):
+    import numpy as np
+    import pandas as pd
+
+    keys = ["Origin_Country", "Destination_Country", "Type"]
+    codes = [data[column].cat.codes.to_numpy() for column in keys]
+    names = [_names(data[column]) for column in keys]
+    local, uniques = pd.factorize(pd.MultiIndex.from_arrays(codes))
+    targets = [table.targets(*(n[c] for n, c in zip(names, key))) for key in uniques]
+
+    # One output row per (row, target of the row's key)
+    counts = np.array([len(group) for group in targets], dtype=np.int64)
+    flat = [target for group in targets for target in group]
+    repeat = counts[local]
+    row = np.repeat(np.arange(len(data)), repeat)
+    first = np.repeat(np.cumsum(repeat) - repeat, repeat)
+    target = np.repeat((np.cumsum(counts) - counts)[local], repeat) + np.arange(len(row)) - first
+
+    def attribute(get, dtype):
+        return np.array([get(t) for t in flat], dtype=dtype)[target] if flat else np.empty(0, dtype=dtype)
+
+    # The places' own coordinates, not the offsets the map draws them at
+    places = gazetteer()
+
+    def coordinate(name, axis):
+        def get(t):
+            location = places.location(t[name])
+            return np.nan if location is None else round(location[axis], 4)
+        return attribute(get, np.float64)
+
+    displaced = data["Number_Displaced"].to_numpy(dtype=np.int64)[row]
+    frame = {column: _names(data[column])[data[column].cat.codes.to_numpy()][row]
+             for column in TEXT_COLUMNS if column != "Target"}
+    frame.update({
+        "Target": attribute(lambda t: t["label"], object),
+        "Internal": attribute(lambda t: t["internal"], bool),
+        "Number_Displaced": displaced,
+        "Displaced_Share": displaced * attribute(lambda t: t["weight"], np.int64)
+                           // attribute(lambda t: t["total"], np.int64),
+        "Origin_Lat": coordinate("Origin_Country", 0),
+        "Origin_Lon": coordinate("Origin_Country", 1),
+        "Target_Lat": coordinate("label", 0),
+        "Target_Lon": coordinate("label", 1),
+    })
+    return pd.DataFrame(frame, columns=COLUMNS)
+
+# -----------------------------
+# ENCODERS
+# -----------------------------
+def csv_chunks(frames):
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+    if header:
+        yield (",".join(COLUMNS) + "\n").encode("utf-8")
+
+
+def geojson_chunks(frames):
+    # A FeatureCollection of origin -> target lines, written feature by feature
+    import math
+
+    yield b'{"type": "FeatureCollection", "features": ['
+    separator = ""
+    for frame in frames:
+        features = []
+        for row in frame.itertuples(index=False):
+            if len(features) == GEOJSON_BATCH:
+                yield (separator + ",".join(features)).encode("utf-8")
+                features, separator = [], ","
+            points = [row.Origin_Lon, row.Origin_Lat, row.Target_Lon, row.Target_Lat]
+            geometry = None
+            if not any(math.isnan(value) for value in points):
+                geometry = {"type": "LineString", "coordinates": [points[:2], points[2:]]}
+            properties = {column: getattr(row, column) for column in COLUMNS if column not in FLOAT_COLUMNS}
+            properties["Internal"] = bool(properties["Internal"])
+            properties["Number_Displaced"] = int(properties["Number_Displaced"])
+            properties["Displaced_Share"] = int(properties["Displaced_Share"])
+            features.append(json.dumps({"type": "Feature", "geometry": geometry, "properties": properties},
+                                       ensure_ascii=False))
+        if features:
+            yield (separator + ",".join(features)).encode("utf-8")
+            separator = ","
+    yield b"]}"
+
+
+class _ChunkSink:
+    # Write-only file for ParquetWriter whose bytes are handed on after each
+    # row group instead of being kept
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(frames):
+    # One row group per chunk; needs pyarrow
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.string()) for column in TEXT_COLUMNS[:4]]
+                       + [("Internal", pa.bool_())]
+                       + [(column, pa.string()) for column in TEXT_COLUMNS[4:]]
+                       + [(column, pa.int64()) for column in INT_COLUMNS]
+                       + [(column, pa.float64()) for column in FLOAT_COLUMNS])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for frame in frames:
+        writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": csv_chunks, "geojson": geojson_chunks, "parquet": parquet_chunks}
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+# -----------------------------
+# FLASK ROUTE
+# -----------------------------
+# GET /export/flows.<csv|geojson|parquet>?period=...&type=...&origin=...
+# The ETag covers the data the store was built from, the disaggregation rules
+# and the request, so a repeated export is answered with 304 before any rows
+# are read. CSV and GeoJSON are gzipped on the fly; Parquet is compressed
+# internally.
+def export_etag(store, fmt, filters, encoding):
+    request_key = json.dumps([
+        EXPORT_VERSION,
+        fmt,
+        store.generation,
+        store.manifest["prefix_sha256"],
+        store.manifest["consumed_bytes"],
+        rules_signature(),
+        {column: sorted(names) for column, names in filters.items()},
+        encoding,
+    ], ensure_ascii=False)
+    return hashlib.sha256(request_key.encode("utf-8")).hexdigest()[:16]
+
+
+def export_flows(fmt):
+    if fmt not in FORMATS:
+        abort(404)
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        abort(501, "Parquet export needs pyarrow")
+
+    filters = {column: request.args.getlist(param) for param, column in FILTER_PARAMS.items()}
+    encoding = "gzip" if fmt != "parquet" and request.accept_encodings["gzip"] else None
+    store = _current_store()
+    etag = export_etag(store, fmt, filters, encoding)
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        chunks = ENCODERS[fmt](export_frames(store, filters))
+        response = Response(_gzip(chunks) if encoding else chunks, mimetype=FORMATS[fmt])
+        response.headers["Content-Disposition"] = f"attachment; filename=flows.{fmt}"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def init_app(server, current_store):
+    global _current_store
+    _current_store = current_store
+    server.add_url_rule(f"{URL_PREFIX}/flows.<fmt>", "export_flows", export_flows)
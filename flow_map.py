@@ -0,0 +1,158 @@
+import math
+
+import plotly.graph_objects as go
+from dash import Patch
+
+from flows import flow_parts, map_elements
+from flowtable import is_external, origin_location
+from geography import style
+
+# -----------------------------
+# TRACE LAYOUT
+# -----------------------------
+# The figure always has the same traces in the same order, so switching period
+# only patches their data: line traces bucketed by width (a Scattergeo trace
+# has a single line width), then one marker trace per kind.
+LINE_WIDTHS = [2, 3, 4, 6]
+MARKER_KINDS = ["origin", "destination", "internal"]
+MARKER_LABELS = {
+    "origin": "Origin",
+    "destination": "Destination",
+    "internal": "Internal displacement",
+}
+
+
+def _marker_color(kind):
+    return style[f"{kind}_color"]
+
+
+def base_figure():
+    fig = go.Figure()
+    for width in LINE_WIDTHS:
+        fig.add_trace(go.Scattergeo(
+            mode="lines", lat=[], lon=[], hoverinfo="skip", showlegend=False, opacity=0.6,
+            line=dict(width=width, color=style["flow_color"])
+        ))
+    for kind in MARKER_KINDS:
+        fig.add_trace(go.Scattergeo(
+            mode="markers", name=MARKER_LABELS[kind], lat=[], lon=[], text=[],
+            hovertemplate="%{text}<extra></extra>",
+            marker=dict(size=[], color=_marker_color(kind), opacity=0.8,
+                        line=dict(width=1, color=_marker_color(kind)))
+        ))
+
+    fig.update_geos(
+        scope="europe",
+        resolution=50,
+        projection_type="mercator",
+        center=dict(lat=style["center"][0], lon=style["center"][1]),
+        lataxis_range=[38, 54],
+        lonaxis_range=[6, 28],
+        showcountries=True,
+        countrycolor="gray",
+        showland=True,
+        landcolor="#f4f4f4",
+        showocean=True,
+        oceancolor="#e8f0f8",
+    )
+    fig.update_layout(
+        margin=dict(t=40, b=10, l=10, r=10),
+        height=600,
+        font=dict(family="Arial", size=13, color="#333"),
+        title=dict(text="", x=0.5, font=dict(size=16, family="Arial Black", color="#333")),
+        legend=dict(orientation="h", x=0, y=0, bgcolor="rgba(255,255,255,0.8)"),
+        uirevision="flow-map",
+        paper_bgcolor="white",
+    )
+    return fig
+
+# -----------------------------
+# TRACE DATA
+# -----------------------------
+def _line_bucket(weight):
+    return max(i for i, width in enumerate(LINE_WIDTHS) if width <= max(weight, LINE_WIDTHS[0]))
+
+
+def marker_size(radius):
+    # Diameter to 2 decimals, with the same float arithmetic as dashboard.js
+    return math.floor(200 * radius + 0.5) / 100
+
+
+def trace_data(matrix, table):
+    lines = [{"lat": [], "lon": []} for _ in LINE_WIDTHS]
+    markers = {kind: {"lat": [], "lon": [], "text": [], "size": []} for kind in MARKER_KINDS}
+
+    for element in map_elements(matrix, table):
+        if element["shape"] == "line":
+            trace = lines[_line_bucket(element["weight"])]
+            (lat0, lon0), (lat1, lon1) = element["path"]
+            trace["lat"] += [round(lat0, 4), round(lat1, 4), None]
+            trace["lon"] += [round(lon0, 4), round(lon1, 4), None]
+        else:
+            trace = markers[element["kind"]]
+            trace["lat"].append(round(element["location"][0], 4))
+            trace["lon"].append(round(element["location"][1], 4))
+            trace["text"].append(element["popup"])
+            trace["size"].append(marker_size(element["radius"]))
+
+    return lines + [markers[kind] for kind in MARKER_KINDS]
+
+
+def flow_map_patch(matrix, table, title):
+    patch = Patch()
+    for i, trace in enumerate(trace_data(matrix, table)):
+        patch["data"][i]["lat"] = trace["lat"]
+        patch["data"][i]["lon"] = trace["lon"]
+        if "text" in trace:
+            patch["data"][i]["text"] = trace["text"]
+            patch["data"][i]["marker"]["size"] = trace["size"]
+    patch["layout"]["title"]["text"] = title
+    return patch
+
+# -----------------------------
+# CLIENT TEMPLATES
+# -----------------------------
+# What assets/dashboard.js needs to rebuild trace_data() and the pie slices in
+# the browser for any window: the parts and pie labels each
+# origin-destination-type key's flow-table rows give, with the coordinates
+# already rounded, and the scales that size them by value.
+def client_style():
+    return {
+        "line_widths": LINE_WIDTHS,
+        "marker_kinds": MARKER_KINDS,
+        "min_radius": style["min_radius"],
+        "max_radius": style["max_radius"],
+        "radius_scale": style["radius_scale"],
+        "weight_scale": style["weight_scale"],
+    }
+
+
+def _round_point(point):
+    return [round(point[0], 4), round(point[1], 4)]
+
+
+def flow_templates(keys, table):
+    origins = [origin for origin in keys["Origin_Country"].cat.categories
+               if origin_location(origin) is not None and (keys["Origin_Country"] == origin).any()]
+    templates = []
+    for row in keys.itertuples(index=False):
+        targets = table.targets(str(row.Origin_Country), str(row.Destination_Country), str(row.Type))
+        parts = []
+        for part in flow_parts(targets):
+            part = dict(part)
+            if part["shape"] == "line":
+                part["path"] = [_round_point(point) for point in part["path"]]
+            else:
+                part["location"] = _round_point(part["location"])
+            parts.append(part)
+        external = row.Origin_Country in origins and is_external(row.Destination_Country)
+        templates.append({
+            "parts": parts,
+            "origin": origins.index(row.Origin_Country) if external else None,
+            "pie": {"from": str(row.Origin_Country),
+                    "labels": [[target["label"], target["weight"], target["total"]] for target in targets]},
+        })
+    return {
+        "keys": templates,
+        "origins": [{"name": origin, "location": _round_point(origin_location(origin))} for origin in origins],
+    }
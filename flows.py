@@ -0,0 +1,182 @@
+import json
+
+import numpy as np
+
+from flowtable import is_external, origin_location
+from geography import place_levels, radius, style
+from places import GridIndex, gazetteer
+
+# -----------------------------
+# MAP ELEMENTS
+# -----------------------------
+# Turns a period's flows and their flow-table rows into the lines and markers
+# drawn on a map, in drawing order. Shared by the folium build and the in-app
+# Plotly map so both show the same flows.
+def _line(path, weight, value):
+    return {"shape": "line", "path": path, "weight": weight, "value": value}
+
+
+def _marker(kind, location, value, popup):
+    return {"shape": "marker", "kind": kind, "location": location, "value": value,
+            "radius": radius(value), "popup": popup}
+
+
+def flow_parts(targets):
+    # The lines and markers one key's flow-table rows draw, independent of its
+    # count. A part with share [weight, total] takes count * weight // total;
+    # popups keep a {value} placeholder and a line weight of None scales with
+    # the value.
+    parts = []
+    for row in targets:
+        if row["origin"] is None or row["location"] is None:
+            continue
+        popup = f"{{value}} {row['Type']}<br>From: {row['Origin_Country']}<br>To: {row['label']}"
+        share = [row["weight"], row["total"]]
+        if row["internal"]:
+            parts.append({"shape": "marker", "kind": "internal", "location": row["location"], "popup": popup,
+                          "share": share})
+        else:
+            parts.append({"shape": "line", "path": [row["origin"], row["location"]], "weight": row["line_weight"],
+                          "share": share})
+            parts.append({"shape": "marker", "kind": "destination", "location": row["location"], "popup": popup,
+                          "share": share})
+    return parts
+
+
+def realize(part, displaced):
+    numerator, denominator = part["share"]
+    value = displaced * numerator // denominator
+    if part["shape"] == "line":
+        weight = part["weight"] if part["weight"] is not None else max(2, value / style["weight_scale"])
+        return _line(part["path"], weight, value)
+    return _marker(part["kind"], part["location"], value, part["popup"].replace("{value}", f"{value:,}"))
+
+
+def map_elements(matrix, table):
+    # matrix: an ODMatrix, one flow per non-zero origin-destination-type cell
+    elements = []
+    for origin, destination, dtype, displaced in matrix.cells():
+        for part in flow_parts(table.targets(str(origin), str(destination), str(dtype))):
+            elements.append(realize(part, int(displaced)))
+
+    # RED ORIGIN DOT SIZED BY TOTAL EXTERNAL DISPLACED
+    for origin, total in matrix.origin_totals(where=is_external).items():
+        location = origin_location(origin)
+        if location is None:
+            continue
+        elements.append(_marker("origin", location, int(total),
+                                f"Total externally displaced from {origin}: {int(total):,}"))
+
+    return elements
+
+# -----------------------------
+# CLUSTERING
+# -----------------------------
+# Markers of one kind, and flow lines by their two ends, that would be drawn
+# within style["cluster_radius"] pixels of each other at a zoom are merged.
+# The largest element of a group keeps its place and the group's counts are
+# summed, so sizes follow the aggregated Number_Displaced. Groups are formed
+# greedily, largest element first, with one GridIndex radius query each.
+CLUSTER_POPUP_LIMIT = 8
+
+
+def _clusters(points, values, zoom):
+    # Per point, the index of the point heading its cluster
+    lat, lon = np.array(points, dtype=np.float64).reshape(-1, 2).T
+    radius = style["cluster_radius"] / 2 ** zoom
+    index = GridIndex.from_coords(lat, lon, radius)
+    head = np.full(len(points), -1, dtype=np.int64)
+    for i in np.argsort(-np.asarray(values, dtype=np.float64), kind="stable"):
+        if head[i] < 0:
+            near = index.within(index.x[i], index.y[i], radius)
+            head[near[head[near] < 0]] = i
+    return head
+
+
+def _bundle(members, path):
+    if len(members) == 1:
+        return members[0]
+    value = sum(line["value"] for line in members)
+    weight = max(max(line["weight"] for line in members), value / style["weight_scale"])
+    return _line(path, weight, value)
+
+
+def _cluster_marker(members, head):
+    if len(members) == 1:
+        return members[0]
+    value = sum(marker["value"] for marker in members)
+    popups = [marker["popup"] for marker in sorted(members, key=lambda marker: -marker["value"])]
+    if len(popups) > CLUSTER_POPUP_LIMIT:
+        popups = popups[:CLUSTER_POPUP_LIMIT] + [f"and {len(popups) - CLUSTER_POPUP_LIMIT} more"]
+    popup = f"{value:,} in total<br><br>" + "<br><br>".join(popups)
+    return _marker(head["kind"], head["location"], value, popup)
+
+
+def cluster_elements(elements, zoom):
+    # Merged elements, in the order their first member is drawn
+    groups = {}  # (shape, head, line end head) -> indexes of the members
+    lines = [i for i, element in enumerate(elements) if element["shape"] == "line"]
+    if lines:
+        values = [elements[i]["value"] for i in lines]
+        starts = _clusters([elements[i]["path"][0] for i in lines], values, zoom)
+        ends = _clusters([elements[i]["path"][1] for i in lines], values, zoom)
+        for i, start, end in zip(lines, starts, ends):
+            groups.setdefault(("line", lines[start], lines[end]), []).append(i)
+    kinds = {}
+    for i, element in enumerate(elements):
+        if element["shape"] == "marker":
+            kinds.setdefault(element["kind"], []).append(i)
+    for markers in kinds.values():
+        heads = _clusters([elements[i]["location"] for i in markers], [elements[i]["value"] for i in markers], zoom)
+        for i, head in zip(markers, heads):
+            groups.setdefault(("marker", markers[head], None), []).append(i)
+
+    clustered = []
+    for (shape, head, end), members in sorted(groups.items(), key=lambda group: group[1][0]):
+        members = [elements[i] for i in members]
+        if shape == "line":
+            clustered.append(_bundle(members, [elements[head]["path"][0], elements[end]["path"][1]]))
+        else:
+            clustered.append(_cluster_marker(members, elements[head]))
+    return clustered
+
+# -----------------------------
+# ZOOM TIERS
+# -----------------------------
+# What a map draws at each zoom, built once at map-generation time. For each
+# zoom the flows are rolled up the place hierarchy to the level
+# style["level_zooms"] gives it (never finer than the places in the data)
+# and clustered for that zoom. Most elements are drawn the same over a run of
+# zooms, so elements are grouped by the zooms they are drawn at and each
+# appears once.
+def zoom_tiers(matrix, table):
+    # [{"min_zoom", "max_zoom", "elements"}]: min_zoom inclusive, max_zoom
+    # exclusive, None at the open ends; elements in drawing order
+    places = gazetteer()
+    finest = max((places.level_of(str(name)) for name in matrix.places), default=0)
+    zooms = range(style["cluster_min_zoom"], style["cluster_max_zoom"] + 1)
+    by_level = {}
+    runs = {}  # element key -> [first zoom, stop zoom, element] per run of zooms
+    for zoom in zooms:
+        level = max((level for level in range(finest + 1)
+                     if style["level_zooms"][place_levels[level]] <= zoom), default=0)
+        if level not in by_level:
+            rolled = matrix if level >= finest else places.rollup(matrix, level)
+            by_level[level] = map_elements(rolled, table)
+        seen = {}
+        for element in cluster_elements(by_level[level], zoom):
+            key = json.dumps(element, sort_keys=True)
+            seen[key] = seen.get(key, -1) + 1
+            run = runs.setdefault((key, seen[key]), [])
+            if run and run[-1][1] == zoom:
+                run[-1][1] = zoom + 1
+            else:
+                run.append([zoom, zoom + 1, element])
+
+    tiers = {}
+    for run in runs.values():
+        for first, stop, element in run:
+            span = (None if first == zooms.start else first, None if stop == zooms.stop else stop)
+            tiers.setdefault(span, []).append(element)
+    return [{"min_zoom": first, "max_zoom": stop, "elements": elements}
+            for (first, stop), elements in tiers.items()]
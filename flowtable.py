@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from geography import disaggregation_rules, style
+from places import gazetteer
+
+# -----------------------------
+# FLOW TABLE
+# -----------------------------
+# Every distinct origin-destination-type key normalized into the places it is
+# drawn and charted at: one row per target, with the share of the key's count
+# it takes and its coordinates. Aggregate destinations are expanded here,
+# following geography.disaggregation_rules, and nowhere else; the map, the pie
+# chart and the client bundle all read these rows. datastore.py builds the
+# table with the store and rebuilds it when the rules or coordinates change.
+SPLIT_LINE_WEIGHT = 2
+
+
+def rules_signature():
+    settings = json.dumps({"rules": disaggregation_rules, "places": gazetteer().signature(), "style": style},
+                          sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+
+
+def origin_location(origin):
+    # None for places without coordinates
+    coords = gazetteer().location(origin)
+    return None if coords is None else [coords[0] - style["lat_shift"], coords[1] - style["lon_shift"]]
+
+
+def is_external(destination):
+    return "internal" not in destination.lower()
+
+
+def flow_rows(origin, destination, dtype):
+    places = gazetteer()
+    rule = disaggregation_rules.get(destination)
+    if rule is None:
+        internal = not is_external(destination)
+        targets = [(destination, destination, 1)]
+    else:
+        internal = rule["internal"]
+        origin_base = origin.replace(" (internal)", "")
+        targets = [(f"{place} (internal)" if internal else place, place, weight)
+                   for place, weight in rule["targets"].items()
+                   if places.location(place) is not None
+                   and not (rule.get("exclude_origin") and place == origin_base)]
+    total = sum(weight for _, _, weight in targets)
+
+    rows = []
+    for i, (label, place, weight) in enumerate(targets):
+        location = places.location(place)
+        if location is not None and internal:
+            lat, lon = location
+            if rule is not None:
+                # Split internal markers sit either side of the place
+                shift = style["split_offset"] * (1 if i % 2 == 0 else -1)
+                location = [lat + shift, lon + shift]
+            else:
+                location = [lat + style["lat_shift"], lon + style["lon_shift"]]
+        rows.append({
+            "Origin_Country": origin,
+            "Destination_Country": destination,
+            "Type": dtype,
+            "label": label,
+            "internal": internal,
+            "weight": weight,
+            "total": total,
+            "origin": origin_location(origin),
+            "location": location,
+            "line_weight": SPLIT_LINE_WEIGHT if rule is not None else None,
+        })
+    return rows
+
+
+class FlowTable:
+    def __init__(self, rows):
+        self.rows = rows
+        self._index = {}
+        for i, row in enumerate(rows):
+            self._index.setdefault((row["Origin_Country"], row["Destination_Country"], row["Type"]), []).append(i)
+
+    @classmethod
+    def from_keys(cls, keys):
+        # keys: (origin, destination, type) name tuples
+        return cls([row for key in dict.fromkeys(keys) for row in flow_rows(*key)])
+
+    @classmethod
+    def from_frame(cls, data):
+        columns = ["Origin_Country", "Destination_Country", "Type"]
+        keys = data[columns].dropna().astype(str).drop_duplicates()
+        return cls.from_keys(keys.itertuples(index=False, name=None))
+
+    def targets(self, origin, destination, dtype):
+        key = (origin, destination, dtype)
+        if key not in self._index:
+            # A key the table was not built with, e.g. an ad hoc frame
+            start = len(self.rows)
+            self.rows.extend(flow_rows(*key))
+            self._index[key] = list(range(start, len(self.rows)))
+        return [self.rows[i] for i in self._index[key]]
+
+    def expand(self, matrix):
+        # (cell, row) pairs: each ODMatrix cell against each of its targets
+        cells, rows = [], []
+        for cell, (origin, destination, dtype, _) in enumerate(matrix.cells()):
+            for row in self.targets(str(origin), str(destination), str(dtype)):
+                cells.append(cell)
+                rows.append(row)
+        return np.array(cells, dtype=np.int64), rows
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+    def save(self, path, signature):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": list(signature), "rows": self.rows}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature):
+        # None when missing or built from other data or rules
+        try:
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if saved.get("signature") != list(signature):
+            return None
+        return cls(saved["rows"])
@@ -0,0 +1,85 @@
+# -----------------------------
+# PLACES
+# -----------------------------
+# MANUAL COORDINATES FOR ORIGINS/DESTINATIONS
+country_coords = {
+    "Croatia": [45.1, 15.2],
+    "Bosnia and Herzegovina": [44.2, 17.7],
+    "Germany": [51.2, 10.5],
+    "Serbia": [44.0, 21.0],
+    "Montenegro": [42.7, 19.4],
+    "Albania": [41.3, 20.2],
+    "North Macedonia": [41.6, 21.7],
+    "Kosovo": [42.6, 20.9],
+    "Other former Yugoslav republics": [44.0, 20.0],
+    "Serbia and Montenegro": [43.8, 20.4],
+    "Croatia and Bosnia": [44.7, 16.7],
+    "Croatia (internal)": [45.1, 15.2],
+    "Bosnia and Herzegovina (internal)": [44.2, 17.7],
+    "Kosovo (internal)": [42.6, 20.9],
+    "Serbia and Montenegro (internal)": [43.8, 20.4]
+}
+
+# PLACE HIERARCHY, COARSEST FIRST. country_coords are the country-level
+# places; finer places are listed in PLACES_PATH with their parent (see
+# places.py), and maps show the level of detail matching the zoom.
+place_levels = ["country", "region", "municipality"]
+PLACES_PATH = "data/places.csv"
+
+yugoslav_republics = [
+    "Croatia", "Slovenia", "Bosnia and Herzegovina",
+    "Republic of Serbia", "Montenegro", "North Macedonia", "Kosovo"
+]
+
+# Places in country_coords that stand for several countries but have no
+# split rule below; they are never the parent of a finer place
+aggregate_places = ["Croatia and Bosnia"]
+
+# AGGREGATE DESTINATIONS, DRAWN AND CHARTED AS THEIR PARTS (see flowtable.py).
+# Each target place takes its weight's share of the flow; internal targets
+# are shown as "<place> (internal)". With exclude_origin a flow never goes
+# to its own origin, and targets without coordinates are left out.
+disaggregation_rules = {
+    "Serbia and Montenegro": {
+        "targets": {"Serbia": 1, "Montenegro": 1},
+        "internal": False,
+    },
+    "Serbia and Montenegro (internal)": {
+        "targets": {"Serbia": 1, "Montenegro": 1},
+        "internal": True,
+    },
+    "Other former Yugoslav republics": {
+        "targets": {republic: 1 for republic in yugoslav_republics},
+        "internal": False,
+        "exclude_origin": True,
+    },
+}
+
+# -----------------------------
+# MAP STYLE
+# -----------------------------
+style = {
+    "center": [44.0, 20.0],
+    "zoom_start": 5,
+    "origin_color": "red",
+    "destination_color": "green",
+    "internal_color": "orange",
+    "flow_color": "blue",
+    "lat_shift": 0.1,
+    "lon_shift": 0.1,
+    "split_offset": 0.07,
+    "min_radius": 5,
+    "max_radius": 25,
+    "radius_scale": 50000,
+    "weight_scale": 200000,
+    # Zoom from which each level of the place hierarchy is drawn
+    "level_zooms": {"country": 0, "region": 7, "municipality": 9},
+    # Markers and line ends closer than this many pixels are merged; the
+    # clustering is redone for every zoom between the two limits
+    "cluster_radius": 10,
+    "cluster_min_zoom": 3,
+    "cluster_max_zoom": 12,
+}
+
+def radius(value):
+    return min(style["max_radius"], max(style["min_radius"], value / style["radius_scale"]))
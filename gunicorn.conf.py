@@ -0,0 +1,50 @@
+import gc
+import multiprocessing
+import os
+
+# -----------------------------
+# SERVER SOCKET
+# -----------------------------
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# -----------------------------
+# WORKERS
+# -----------------------------
+# Threaded workers, so a slow client only holds one thread, not a whole
+# process. Defaults to one worker per core.
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread"
+keepalive = 5
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+
+# Recycle workers now and then; jitter keeps them from restarting together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+
+# -----------------------------
+# SHARED STATE
+# -----------------------------
+# Import app.py once in the master and warm it there: data store, render
+# caches, client bundle and map asset hashes are built before forking and
+# shared copy-on-write.
+preload_app = True
+
+
+def when_ready(server):
+    import app
+    app.warm_caches()
+
+
+def pre_fork(server, worker):
+    # Move everything built so far out of the GC's reach, so collections in
+    # the workers don't write to (and un-share) those pages.
+    gc.freeze()
+
+# -----------------------------
+# LOGGING
+# -----------------------------
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
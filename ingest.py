@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# SCHEMA
+# -----------------------------
+CATEGORY_COLUMNS = ["Period", "Origin_Country", "Destination_Country", "Type", "Conflict", "Source"]
+RANGE_DASH = "–"
+# One count, commas removed; whitespace is allowed around it as int() allows
+COUNT_PATTERN = r"\s*\d+\s*"
+
+# -----------------------------
+# PARSING
+# -----------------------------
+# Row-by-row reference kept for the notebook and for comparison with the
+# vectorized path below (tests/test_ingest.py).
+def parse_displacement(val):
+    if isinstance(val, str) and RANGE_DASH in val:
+        nums = [int(x.replace(',', '')) for x in val.split(RANGE_DASH)]
+        return sum(nums) // 2
+    elif isinstance(val, str):
+        return int(val.replace(',', ''))
+    return val
+
+
+def parse_displacement_column(values):
+    # "10,000–20,000" -> 15000, "265,000" -> 265000, 160000 -> 160000
+    if pd.api.types.is_numeric_dtype(values):
+        return _compact_int(values.fillna(0))
+
+    # Counts repeat heavily in large extracts, so parse each distinct string
+    # once; missing counts get code -1 and become 0
+    codes, uniques = pd.factorize(values.astype(object), use_na_sentinel=True)
+    text = pd.Series(uniques, dtype=object).astype(str).str.replace(",", "", regex=False)
+    bounds = text.str.split(RANGE_DASH, n=1, expand=True).reindex(columns=[0, 1]).astype(object)
+    low, high = bounds[0], bounds[1]
+    is_range = high.notna()
+
+    valid = low.str.fullmatch(COUNT_PATTERN).fillna(False)
+    valid &= ~is_range | high.str.fullmatch(COUNT_PATTERN).fillna(False)
+    if not valid.all():
+        raise ValueError(f"Invalid Number Displaced value: {text[~valid].iloc[0]!r}")
+
+    counts = low.astype("int64")
+    counts[is_range] = (counts[is_range] + high[is_range].astype("int64")) // 2
+    return _compact_int(pd.Series(np.append(counts.to_numpy(), 0)[codes], index=values.index))
+
+
+def _compact_int(values):
+    values = values.astype("int64")
+    if len(values) and values.abs().max() >= np.iinfo(np.int32).max:
+        return values
+    return values.astype("int32")
+
+
+def normalize_columns(data):
+    data.columns = data.columns.str.strip().str.replace(" ", "_")
+    for column in CATEGORY_COLUMNS:
+        if column in data.columns:
+            data[column] = data[column].astype("category")
+    data["Number_Displaced"] = parse_displacement_column(data["Number_Displaced"])
+    return data
+
+
+def read_displacement_csv(path):
+    return normalize_columns(pd.read_csv(path, dtype={"Number Displaced": "string"}))
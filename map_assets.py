@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import os
+
+from flask import Response, abort, request
+from werkzeug.utils import safe_join
+
+from metrics import map_file_reads
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+MAPS_DIR = "maps"
+URL_PREFIX = "/maps"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+STALE_CACHE = "no-cache"
+MIMETYPES = {".html": "text/html", ".json": "application/json"}
+# ETag suffix per content coding: each coding is a different representation,
+# so it needs its own strong ETag
+ETAG_SUFFIXES = {"gzip": "-gz", "br": "-br"}
+
+# filename -> {"mtime", "size", "etag"}
+_assets = {}
+
+# -----------------------------
+# HASHING & PRECOMPRESSION
+# -----------------------------
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _precompress(path, data):
+    variants = [(".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda raw: brotli.compress(raw, quality=11)))
+
+    source_mtime = os.stat(path).st_mtime_ns
+    for suffix, compress in variants:
+        target = path + suffix
+        if os.path.exists(target) and os.stat(target).st_mtime_ns >= source_mtime:
+            continue
+        _write_atomic(target, compress(data))
+
+
+def asset_info(filename):
+    path = safe_join(MAPS_DIR, filename)
+    if path is None or os.path.splitext(filename)[1] not in MIMETYPES or not os.path.isfile(path):
+        return None
+
+    st = os.stat(path)
+    info = _assets.get(filename)
+    if info and info["mtime"] == st.st_mtime_ns and info["size"] == st.st_size:
+        return info
+
+    with open(path, "rb") as f:
+        data = f.read()
+    map_file_reads.inc("hash")
+    _precompress(path, data)
+
+    info = {
+        "mtime": st.st_mtime_ns,
+        "size": st.st_size,
+        "etag": content_hash(data),
+    }
+    _assets[filename] = info
+    return info
+
+
+def map_url(map_path):
+    filename = os.path.relpath(map_path, MAPS_DIR).replace(os.sep, "/")
+    info = asset_info(filename)
+    if info is None:
+        return None
+    return f"{URL_PREFIX}/{info['etag']}/{filename}"
+
+# -----------------------------
+# FLASK ROUTE
+# -----------------------------
+def _pick_encoding(path):
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"] and os.path.exists(path + ".br"):
+        return "br", path + ".br"
+    if accepted["gzip"] and os.path.exists(path + ".gz"):
+        return "gzip", path + ".gz"
+    return None, path
+
+
+def serve_map(version, filename):
+    info = asset_info(filename)
+    if info is None:
+        abort(404)
+
+    cache_control = IMMUTABLE_CACHE if version == info["etag"] else STALE_CACHE
+    encoding, path = _pick_encoding(safe_join(MAPS_DIR, filename))
+    etag = info["etag"] + ETAG_SUFFIXES.get(encoding, "")
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        with open(path, "rb") as f:
+            response = Response(f.read(), mimetype=MIMETYPES[os.path.splitext(filename)[1]])
+        map_file_reads.inc("serve")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+
+def init_app(server, map_paths=()):
+    server.add_url_rule(f"{URL_PREFIX}/<version>/<path:filename>", "serve_map", serve_map)
+
+    # Hash and compress known maps at startup so the first request is cheap
+    for map_path in map_paths:
+        map_url(map_path)
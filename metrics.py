@@ -0,0 +1,300 @@
+import hmac
+import os
+import resource
+import sys
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import Counter as StackCounter, deque
+from contextlib import contextmanager
+
+from flask import Response, abort, g, request
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+# Metrics are kept per process; under gunicorn each worker reports its own.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PROFILER_TOKEN = os.environ.get("PROFILER_TOKEN")
+
+# -----------------------------
+# METRIC TYPES
+# -----------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels_text(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=(), collect=None):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        # Optional callable yielding (label_values, value) pairs at scrape time
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def expose(self):
+        if self.collect is not None:
+            with self._lock:
+                self._values.update(self.collect())
+        lines = self.header()
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{_labels_text(self.labels, values)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, *label_values, value):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def expose(self):
+        lines = self.header()
+        label_names = self.labels + ("le",)
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels_text(label_names, values + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{_labels_text(self.labels, values)} {count}")
+        return lines
+
+
+REGISTRY = []
+
+# -----------------------------
+# DASHBOARD METRICS
+# -----------------------------
+request_seconds = Histogram("dashboard_request_seconds", "HTTP request latency by endpoint.", ["endpoint"])
+callback_seconds = Histogram("dashboard_callback_seconds", "Dash callback latency by callback outputs.", ["callback"])
+stage_seconds = Histogram("dashboard_stage_seconds", "Time spent in each rendering stage.", ["stage"])
+output_bytes = Histogram("dashboard_output_bytes", "Serialized callback payload size per output ID.",
+                         ["output"], buckets=SIZE_BUCKETS)
+response_bytes = Histogram("dashboard_response_bytes", "HTTP response body size by endpoint.",
+                           ["endpoint"], buckets=SIZE_BUCKETS)
+map_file_reads = Counter("dashboard_map_file_reads_total", "Map asset files read from disk.", ["reason"])
+
+_caches = {}
+
+
+def register_cache(name, cache):
+    _caches[name] = cache
+
+
+def _cache_requests():
+    for name, cache in _caches.items():
+        yield (name, "hit"), cache.hits
+        yield (name, "miss"), cache.misses
+
+
+def _cache_bytes():
+    for name, cache in _caches.items():
+        yield (name,), cache.total_bytes
+
+
+def _memory():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = f.read().split()
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        yield ("resident",), int(pages[1]) * page_size
+        yield ("virtual",), int(pages[0]) * page_size
+    except (OSError, ValueError, IndexError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    yield ("peak_resident",), peak if sys.platform == "darwin" else peak * 1024
+
+
+Counter("dashboard_cache_requests_total", "Render cache lookups by result.",
+        ["cache", "result"], collect=_cache_requests)
+Gauge("dashboard_cache_bytes", "Serialized bytes held by each render cache.", ["cache"], collect=_cache_bytes)
+Gauge("process_memory_bytes", "Process memory by kind.", ["kind"], collect=_memory)
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(name, value=time.perf_counter() - started)
+
+
+def observe_outputs(output_ids, sizes):
+    for output_id, size in zip(output_ids, sizes):
+        output_bytes.observe(output_id, value=size)
+
+
+def expose():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.expose())
+    return "\n".join(lines) + "\n"
+
+# -----------------------------
+# SAMPLING PROFILER
+# -----------------------------
+# Off by default. When enabled, a background thread samples the stacks of
+# threads that are serving requests; requests slower than the threshold keep
+# their samples as collapsed stacks, viewable at /debug/profiler.
+class SamplingProfiler:
+    def __init__(self, interval=0.005, threshold=0.5, keep=20):
+        self.interval = interval
+        self.threshold = threshold
+        self.enabled = False
+        self.slow_requests = deque(maxlen=keep)
+        self._active = {}  # thread id -> StackCounter
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def enable(self, threshold=None):
+        if threshold is not None:
+            self.threshold = threshold
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def begin(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            # Started lazily so each forked worker gets its own sampler thread
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+            self._active[threading.get_ident()] = StackCounter()
+
+    def end(self, label, duration):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if samples and duration >= self.threshold:
+            self.slow_requests.append({
+                "label": label,
+                "seconds": round(duration, 4),
+                "stacks": samples.most_common(25),
+            })
+
+    def _run(self):
+        while self.enabled:
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = traceback.extract_stack(frame)
+                        samples[";".join(f"{f.name} ({os.path.basename(f.filename)}:{f.lineno})"
+                                         for f in stack)] += 1
+            time.sleep(self.interval)
+
+
+profiler = SamplingProfiler()
+
+# -----------------------------
+# FLASK INTEGRATION
+# -----------------------------
+def _endpoint():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    profiler.begin()
+
+
+def _after_request(response):
+    duration = time.perf_counter() - g.get("metrics_started", time.perf_counter())
+    endpoint = _endpoint()
+    request_seconds.observe(endpoint, value=duration)
+    if not response.is_streamed and response.content_length is not None:
+        response_bytes.observe(endpoint, value=response.content_length)
+
+    label = endpoint
+    if request.path.endswith("/_dash-update-component"):
+        # Unknown outputs fail in Dash; keep them out of the label set
+        body = request.get_json(silent=True) or {}
+        label = body.get("output", "unknown") if response.status_code < 400 else "error"
+        callback_seconds.observe(label, value=duration)
+    profiler.end(label, duration)
+    return response
+
+
+def _metrics_view():
+    return Response(expose(), content_type=CONTENT_TYPE)
+
+
+def _profiler_view():
+    if not PROFILER_TOKEN:
+        abort(404)
+    # Recorded stacks expose file paths and request labels, so reads need the token too
+    if not hmac.compare_digest(request.headers.get("X-Profiler-Token", ""), PROFILER_TOKEN):
+        abort(403)
+    if request.method == "POST":
+        if request.args.get("enable", "1") == "0":
+            profiler.disable()
+        else:
+            threshold_ms = request.args.get("threshold_ms", type=float)
+            profiler.enable(threshold_ms / 1000 if threshold_ms is not None else None)
+    return {
+        "enabled": profiler.enabled,
+        "threshold_seconds": profiler.threshold,
+        "slow_requests": list(profiler.slow_requests),
+    }
+
+
+def init_app(server):
+    server.before_request(_before_request)
+    server.after_request(_after_request)
+    server.add_url_rule("/metrics", "metrics", _metrics_view)
+    server.add_url_rule("/debug/profiler", "profiler", _profiler_view, methods=["GET", "POST"])
+    if os.environ.get("PROFILER_ENABLED") == "1":
+        profiler.enable(float(os.environ.get("PROFILER_THRESHOLD_MS", 500)) / 1000)
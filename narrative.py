@@ -0,0 +1,37 @@
+import json
+
+from dash import html
+
+# -----------------------------
+# NARRATIVE CONTENT
+# -----------------------------
+# The background text, expanded timeline and survivor testimonies for each
+# period live in content/<period>.json. They are only turned into Dash
+# components when a period is first rendered, not when the app is imported.
+def load_narrative(path):
+    with open(path, encoding="utf-8") as f:
+        content = json.load(f)
+
+    description = html.Div([
+        part
+        for section in content["description"]
+        for part in (html.H5(section["heading"]), html.P(section["text"]))
+    ])
+
+    timeline = content["timeline"]
+    timeline = html.Div([
+        html.H4(timeline["title"]),
+        *(part
+          for event in timeline["events"]
+          for part in (html.H5(event["heading"]), html.P(event["text"])))
+    ])
+
+    testimonies = [
+        html.Blockquote([
+            *(html.P(paragraph) for paragraph in testimony["paragraphs"]),
+            html.Footer(html.A(testimony["source"]["label"], href=testimony["source"]["href"], target="_blank"))
+        ])
+        for testimony in content["testimonies"]
+    ]
+
+    return description, timeline, testimonies
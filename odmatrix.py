@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# OD MATRIX
+# -----------------------------
+# Flows as a sparse origin x destination x type matrix. Places (origins and
+# destinations share one dictionary) and types are integer-coded, and only
+# non-zero cells are stored, coalesced and kept in the order they first
+# appear in the rows. Every query below works on those cells, so it costs
+# time in proportion to the cells it touches rather than to the raw rows.
+class ODMatrix:
+    def __init__(self, places, types, origin, destination, type_code, value):
+        self.places = pd.Index(places, dtype=object)
+        self.types = pd.Index(types, dtype=object)
+        self.origin = origin
+        self.destination = destination
+        self.type = type_code
+        self.value = value
+        self._by_origin = None
+        self._by_destination = None
+
+    @classmethod
+    def from_codes(cls, places, types, origin, destination, type_code, value):
+        origin = np.asarray(origin, dtype=np.int64)
+        destination = np.asarray(destination, dtype=np.int64)
+        type_code = np.asarray(type_code, dtype=np.int64)
+        value = np.asarray(value, dtype=np.int64)
+
+        keep = (origin >= 0) & (destination >= 0) & (type_code >= 0)
+        origin, destination, type_code, value = origin[keep], destination[keep], type_code[keep], value[keep]
+
+        # Sum repeated (origin, destination, type) cells, in order of first appearance
+        key = (origin * len(places) + destination) * max(len(types), 1) + type_code
+        cell, uniques = pd.factorize(key)
+        order = np.argsort(cell, kind="stable")
+        starts = np.flatnonzero(np.diff(cell[order], prepend=-1))
+        sums = np.add.reduceat(value[order], starts) if len(order) else value[:0]
+        first = order[starts]
+
+        nonzero = sums != 0
+        return cls(places, types, origin[first][nonzero], destination[first][nonzero],
+                   type_code[first][nonzero], sums[nonzero])
+
+    @classmethod
+    def from_frame(cls, data):
+        # Rows with Origin_Country, Destination_Country, Type and Number_Displaced
+        return cls.from_codes(*frame_codes(data), data["Number_Displaced"].to_numpy())
+
+    def __len__(self):
+        return len(self.value)
+
+    def place_code(self, name):
+        return self.places.get_indexer([name])[0]
+
+    def cells(self):
+        # (origin, destination, type, value) per non-zero cell
+        return zip(self.places[self.origin], self.places[self.destination], self.types[self.type], self.value)
+
+    # -----------------------------
+    # AGGREGATES
+    # -----------------------------
+    def destination_totals(self):
+        return self._totals(self.destination, self.places, np.ones(len(self), dtype=bool))
+
+    def origin_totals(self, where=None):
+        # where: optional predicate on destination names, e.g. external only
+        if where is None:
+            mask = np.ones(len(self), dtype=bool)
+        else:
+            mask = np.array([bool(where(name)) for name in self.places], dtype=bool)[self.destination]
+        return self._totals(self.origin, self.places, mask)
+
+    def type_totals(self, origin=None, destination=None):
+        cells = self._slice(origin, destination)
+        mask = np.zeros(len(self), dtype=bool)
+        mask[cells] = True
+        return self._totals(self.type, self.types, mask)
+
+    def top_corridors(self, k=10):
+        # Largest origin -> destination flows, summed over types
+        pair = self.origin * len(self.places) + self.destination
+        ids, uniques = pd.factorize(pair)
+        totals = np.zeros(len(uniques), dtype=np.int64)
+        np.add.at(totals, ids, self.value)
+        k = min(k, len(totals))
+        top = np.argpartition(-totals, k - 1)[:k] if k else np.empty(0, dtype=np.int64)
+        top = top[np.argsort(-totals[top], kind="stable")]
+        return pd.DataFrame({
+            "origin": self.places[uniques[top] // len(self.places)],
+            "destination": self.places[uniques[top] % len(self.places)],
+            "value": totals[top],
+        })
+
+    def flow(self, origin, destination):
+        cells = self._slice(origin, destination)
+        return int(self.value[cells].sum())
+
+    def net_flow(self, a, b):
+        # Positive when more people moved from a to b than from b to a
+        return self.flow(a, b) - self.flow(b, a)
+
+    # -----------------------------
+    # INDEXES
+    # -----------------------------
+    # Cells grouped by origin or destination (CSR-style offsets), built on
+    # first use, so one place's row or column is a slice.
+    def _index(self, codes):
+        order = np.argsort(codes, kind="stable")
+        offsets = np.zeros(len(self.places) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(self.places)), out=offsets[1:])
+        return order, offsets
+
+    def _slice(self, origin=None, destination=None):
+        if origin is None and destination is None:
+            return np.arange(len(self))
+        if origin is not None:
+            if self._by_origin is None:
+                self._by_origin = self._index(self.origin)
+            order, offsets = self._by_origin
+            code = self.place_code(origin)
+            cells = order[offsets[code]:offsets[code + 1]] if code >= 0 else order[:0]
+            if destination is not None:
+                cells = cells[self.destination[cells] == self.place_code(destination)]
+            return np.sort(cells)
+        if self._by_destination is None:
+            self._by_destination = self._index(self.destination)
+        order, offsets = self._by_destination
+        code = self.place_code(destination)
+        return np.sort(order[offsets[code]:offsets[code + 1]]) if code >= 0 else order[:0]
+
+    def _totals(self, codes, names, mask):
+        # Totals per code, ordered by first appearance among the cells
+        codes = codes[mask]
+        values = self.value[mask]
+        unique, first = np.unique(codes, return_index=True)
+        unique = unique[np.argsort(first, kind="stable")]
+        totals = np.zeros(len(names), dtype=np.int64)
+        np.add.at(totals, codes, values)
+        return pd.Series(totals[unique], index=names[unique], dtype=np.int64)
+
+
+def frame_codes(data):
+    # (places, types, origin, destination, type codes) for the rows of data;
+    # missing values are coded -1 and dropped by from_codes()
+    origin = data["Origin_Country"].astype("category")
+    destination = data["Destination_Country"].astype("category")
+    dtype = data["Type"].astype("category")
+    places = origin.cat.categories.union(destination.cat.categories)
+    return places, dtype.cat.categories, _recode(origin, places), _recode(destination, places), dtype.cat.codes.to_numpy()
+
+
+def _recode(column, places):
+    # Category codes -> place codes; missing values stay -1
+    mapping = np.append(places.get_indexer(column.cat.categories), -1)
+    return mapping[column.cat.codes.to_numpy()]
+
+# -----------------------------
+# PIE CHART SLICES
+# -----------------------------
+# Destination totals by flow-table target, so aggregate destinations show as
+# the same parts as on the map, plus the hover text listing the origins behind
+# each slice in order of appearance.
+def destination_totals(matrix, table):
+    cell, targets = table.expand(matrix)
+    labels = np.array([target["label"] for target in targets], dtype=object)
+    weights = np.array([target["weight"] for target in targets], dtype=np.int64)
+    shares = np.array([target["total"] for target in targets], dtype=np.int64)
+    values = matrix.value[cell] * weights // shares if len(cell) else matrix.value[:0]
+
+    label_ids, label_names = pd.factorize(labels)
+    totals = np.zeros(len(label_names), dtype=np.int64)
+    np.add.at(totals, label_ids, values)
+
+    origins = [[] for _ in label_names]
+    pairs, _ = pd.factorize(label_ids * len(matrix.places) + matrix.origin[cell])
+    _, first = np.unique(pairs, return_index=True)
+    for i in np.sort(first):
+        origins[label_ids[i]].append(str(matrix.places[matrix.origin[cell[i]]]))
+
+    return pd.DataFrame({
+        "label": np.asarray(label_names, dtype=object).astype(str),
+        "value": totals,
+        "hover": [f"From: {', '.join(o)} → {dest}<br>{total:,} displaced"
+                  for dest, total, o in zip(label_names, totals, origins)],
+    })
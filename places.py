@@ -0,0 +1,189 @@
+import csv
+import hashlib
+import json
+import math
+
+import numpy as np
+
+from geography import PLACES_PATH, aggregate_places, country_coords, disaggregation_rules, place_levels
+
+INTERNAL_SUFFIX = " (internal)"
+# Side of the Web Mercator world in pixels at zoom 0 (Leaflet's tile size)
+WORLD_PIXELS = 256
+
+# -----------------------------
+# PROJECTION
+# -----------------------------
+def project(lat, lon):
+    # Web Mercator pixel coordinates at zoom 0; one pixel at zoom z is 2**-z of these
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)
+    lon = np.asarray(lon, dtype=np.float64)
+    sin = np.sin(np.radians(lat))
+    x = (lon + 180) / 360 * WORLD_PIXELS
+    y = (0.5 - np.log((1 + sin) / (1 - sin)) / (4 * math.pi)) * WORLD_PIXELS
+    return x, y
+
+# -----------------------------
+# SPATIAL INDEX
+# -----------------------------
+# Points bucketed into square cells of projected pixels, stored CSR-style
+# like the OD matrix indexes: the points sorted by cell and each occupied
+# cell's range into them. A radius query only visits the cells the circle
+# overlaps, so with the cell size set to the radius it reads 3 x 3 cells.
+class GridIndex:
+    def __init__(self, x, y, cell):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.cell = cell
+        self._stride = int(WORLD_PIXELS / cell) + 2
+        keys = self._key(np.floor(self.x / cell).astype(np.int64), np.floor(self.y / cell).astype(np.int64))
+        self.order = np.argsort(keys, kind="stable")
+        occupied, starts = np.unique(keys[self.order], return_index=True)
+        stops = np.append(starts[1:], len(keys))
+        self.ranges = dict(zip(occupied.tolist(), zip(starts.tolist(), stops.tolist())))
+
+    @classmethod
+    def from_coords(cls, lat, lon, cell):
+        return cls(*project(lat, lon), cell)
+
+    def __len__(self):
+        return len(self.x)
+
+    def _key(self, cx, cy):
+        return cx * self._stride + cy
+
+    def _cells(self, cx_range, cy_range):
+        found = [self.order[start:stop]
+                 for cx in cx_range for cy in cy_range
+                 for start, stop in [self.ranges.get(self._key(cx, cy), (0, 0))]]
+        return np.concatenate(found) if found else self.order[:0]
+
+    def within(self, x, y, radius):
+        # Points no further than radius pixels (zoom 0) from (x, y), in index order
+        cx = range(math.floor((x - radius) / self.cell), math.floor((x + radius) / self.cell) + 1)
+        cy = range(math.floor((y - radius) / self.cell), math.floor((y + radius) / self.cell) + 1)
+        points = self._cells(cx, cy)
+        near = (self.x[points] - x) ** 2 + (self.y[points] - y) ** 2 <= radius ** 2
+        return np.sort(points[near])
+
+# -----------------------------
+# GAZETTEER
+# -----------------------------
+# Every place that can be drawn, with its level in geography.place_levels,
+# the place it lies in and its coordinates. Countries come from
+# country_coords and finer places from PLACES_PATH (columns name, level,
+# parent, lat, lon). Every finer place names its parent, which must be a
+# real place of a coarser level: not an aggregate destination or an
+# "(internal)" alias, which only exist as flow endpoints. Names are looked up
+# through one dict into the arrays. "<place> (internal)" resolves to the place
+# itself unless it is listed on its own.
+class Gazetteer:
+    def __init__(self, names, levels, parents, coords):
+        self.names = list(names)
+        self.ids = {}
+        for i, name in enumerate(self.names):
+            self.ids.setdefault(name, i)
+        self.level = np.array(levels, dtype=np.int64)
+        self.parent = np.array(parents, dtype=np.int64)
+        self.coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows: (name, level name, parent name or None, lat, lon)
+        rows = sorted(rows, key=lambda row: place_levels.index(row[1]))
+        ids = {}
+        for i, (name, *_) in enumerate(rows):
+            ids.setdefault(name, i)
+
+        parents = []
+        for name, level, parent, _, _ in rows:
+            if level == place_levels[0]:
+                parents.append(-1)
+            elif not parent:
+                raise ValueError(f"{name}: a {level} needs a parent")
+            elif (parent not in ids or not is_real_place(parent)
+                  or place_levels.index(rows[ids[parent]][1]) >= place_levels.index(level)):
+                raise ValueError(f"{name}: parent {parent!r} is not a known place of a coarser level")
+            else:
+                parents.append(ids[parent])
+        return cls([row[0] for row in rows], [place_levels.index(row[1]) for row in rows], parents,
+                   [[row[3], row[4]] for row in rows])
+
+    def place_id(self, name):
+        i = self.ids.get(name)
+        if i is None and name.endswith(INTERNAL_SUFFIX):
+            i = self.ids.get(name[:-len(INTERNAL_SUFFIX)])
+        return -1 if i is None else i
+
+    def location(self, name):
+        # [lat, lon], or None for places without coordinates
+        i = self.place_id(name)
+        return None if i < 0 else self.coords[i].tolist()
+
+    def level_of(self, name):
+        # Unknown names are taken as country level
+        i = self.place_id(name)
+        return 0 if i < 0 else int(self.level[i])
+
+    def ancestor(self, name, level):
+        # The place containing name at level, keeping an "(internal)"
+        # suffix; the name itself when it is that coarse or unknown
+        i = self.ids.get(name)
+        suffix = ""
+        if i is None and name.endswith(INTERNAL_SUFFIX):
+            i, suffix = self.ids.get(name[:-len(INTERNAL_SUFFIX)]), INTERNAL_SUFFIX
+        if i is None or self.level[i] <= level:
+            return name
+        while self.level[i] > level and self.parent[i] >= 0:
+            i = self.parent[i]
+        return self.names[i] + suffix
+
+    def rollup(self, matrix, level):
+        # The ODMatrix with every place replaced by the place containing it
+        # at level and the cells that then coincide summed. Moves between two
+        # places inside one coarser place become internal displacement there.
+        import pandas as pd
+
+        from odmatrix import ODMatrix
+
+        ancestors = np.array([self.ancestor(str(name), level) for name in matrix.places], dtype=object)
+        origin = ancestors[matrix.origin]
+        destination = ancestors[matrix.destination].copy()
+        inside = (origin == destination) & (matrix.origin != matrix.destination)
+        destination[inside] = origin[inside] + INTERNAL_SUFFIX
+        codes, places = pd.factorize(np.concatenate([origin, destination]))
+        return ODMatrix.from_codes(places, matrix.types, codes[:len(origin)], codes[len(origin):],
+                                   matrix.type, matrix.value)
+
+    def signature(self):
+        places = json.dumps([self.names, self.level.tolist(), self.parent.tolist(),
+                             np.round(self.coords, 6).tolist()], ensure_ascii=False)
+        return hashlib.sha256(places.encode("utf-8")).hexdigest()[:16]
+
+
+def is_real_place(name):
+    # False for aggregate destinations and "(internal)" aliases
+    return (not name.endswith(INTERNAL_SUFFIX) and name not in disaggregation_rules
+            and name not in aggregate_places)
+
+
+def load_gazetteer(path=PLACES_PATH):
+    rows = [(name, place_levels[0], None, lat, lon) for name, (lat, lon) in country_coords.items()]
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows += [(row["name"], row["level"], row.get("parent") or None, float(row["lat"]), float(row["lon"]))
+                     for row in csv.DictReader(f)]
+    except FileNotFoundError:
+        pass
+    return Gazetteer.from_rows(rows)
+
+
+_gazetteer = None
+
+
+def gazetteer():
+    # Loaded once per process
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = load_gazetteer()
+    return _gazetteer
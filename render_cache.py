@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import OrderedDict
+
+from plotly.io.json import to_json_plotly
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+DEFAULT_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return (path, None, None)
+    return (path, st.st_mtime_ns, st.st_size)
+
+# -----------------------------
+# LRU RENDER CACHE
+# -----------------------------
+# Holds the fully built callback outputs per key. Each entry remembers the
+# signatures of the files it was built from, so touching the CSV or a map
+# file rebuilds that entry on its next lookup. Entries are weighed by their
+# serialized JSON size and evicted least-recently-used first.
+class RenderCache:
+    def __init__(self, build, max_bytes=DEFAULT_MAX_BYTES):
+        self.build = build
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, dependencies=()):
+        return self.lookup(key, dependencies)[0]
+
+    def lookup(self, key, dependencies=()):
+        # Returns (outputs, serialized size of each output)
+        signature = tuple(file_signature(path) for path in dependencies)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[3]
+            self.misses += 1
+
+        outputs = self.build(key)
+        parts = outputs if isinstance(outputs, tuple) else (outputs,)
+        sizes = tuple(len(to_json_plotly(part)) for part in parts)
+        size = sum(sizes)
+
+        with self._lock:
+            self._discard(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (signature, outputs, size, sizes)
+                self.total_bytes += size
+                while self.total_bytes > self.max_bytes:
+                    self._discard(next(iter(self._entries)))
+        return outputs, sizes
+
+    def warm(self, keys, dependencies_for):
+        for key in keys:
+            self.get(key, dependencies_for(key))
+            if self.total_bytes >= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry[2]
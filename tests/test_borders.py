@@ -0,0 +1,41 @@
+import numpy as np
+
+from borders import DETAIL_TIERS, build_topology, simplify_arc, to_topojson
+
+
+def _square(x, y, size, steps=10):
+    edge = np.linspace(0, size, steps, endpoint=False)
+    ring = ([[x + d, y] for d in edge] + [[x + size, y + d] for d in edge]
+            + [[x + size - d, y + size] for d in edge] + [[x, y + size - d] for d in edge])
+    return ring + [ring[0]]
+
+
+def _decode(arc):
+    return np.cumsum(np.array(arc), axis=0)
+
+
+def test_small_island_keeps_a_ring_at_every_tier():
+    geojson = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"admin": "Mainland"},
+         "geometry": {"type": "Polygon", "coordinates": [_square(0, 0, 20)]}},
+        {"type": "Feature", "properties": {"admin": "Island"},
+         "geometry": {"type": "Polygon", "coordinates": [_square(30, 10, 0.01)]}},
+    ]}
+    topology = build_topology(geojson)
+    for _, tolerance in DETAIL_TIERS:
+        topo = to_topojson(topology, tolerance)
+        for geometry in topo["objects"]["borders"]["geometries"]:
+            for polygon in geometry["arcs"]:
+                for ring in polygon:
+                    points = np.vstack([_decode(topo["arcs"][~i])[::-1] if i < 0 else _decode(topo["arcs"][i])
+                                        for i in ring])
+                    assert len({tuple(point) for point in points}) >= 3
+                    assert tuple(points[0]) == tuple(points[-1])
+
+
+def test_closed_arc_never_drops_below_four_points():
+    ring = np.array(_square(0, 0, 10), dtype=np.int64)
+    simplified = simplify_arc(ring, 1e9)
+    assert len(simplified) >= 4
+    assert len({tuple(point) for point in simplified}) >= 3
+    assert tuple(simplified[0]) == tuple(simplified[-1])
@@ -0,0 +1,98 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from datastore import MANIFEST, PartitionedStore, build_store, open_store
+
+DATA_PATH = "data/Yugoslav_War_Data.csv"
+NEW_ROWS = ("1991–1992,Croatia,Germany,Refugees,\"1,000–3,000\",Croatian War,UNHCR\n"
+            "2001,North Macedonia,Kosovo,Refugees,5000,Macedonian Conflict,UNHCR\n")
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "data.csv"
+    shutil.copyfile(DATA_PATH, path)
+    return str(path)
+
+
+def rows(store):
+    # The store's rows by name, comparable across stores with other codes
+    frame = store.frame()
+    return frame.astype({column: str for column in frame.columns if column != "Number_Displaced"})
+
+
+def fresh(csv_path, tmp_path):
+    return open_store(csv_path, str(tmp_path / "fresh"))
+
+
+def partition_file(store, period, column="Number_Displaced"):
+    return os.path.join(store.store_dir, store.manifest["partitions"][period]["dir"], f"{column}.bin")
+
+# -----------------------------
+# APPEND
+# -----------------------------
+def test_grown_csv_is_appended(csv_path, tmp_path):
+    store_dir = str(tmp_path / "store")
+    before = open_store(csv_path, store_dir)
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write(NEW_ROWS)
+
+    after = open_store(csv_path, store_dir)
+    assert after.generation == before.generation
+    assert after.manifest["consumed_bytes"] == os.path.getsize(csv_path)
+    assert after.manifest["partitions"]["1991–1992"]["rows"] == \
+        before.manifest["partitions"]["1991–1992"]["rows"] + 1
+    assert after.periods[-1] == "2001"
+    pd.testing.assert_frame_equal(rows(after), rows(fresh(csv_path, tmp_path)))
+    assert [t["label"] for t in after.flow_table().targets("North Macedonia", "Kosovo", "Refugees")] == ["Kosovo"]
+
+
+def test_edited_csv_is_rebuilt(csv_path, tmp_path):
+    store_dir = str(tmp_path / "store")
+    before = open_store(csv_path, store_dir)
+    with open(csv_path, encoding="utf-8-sig") as f:
+        text = f.read()
+    with open(csv_path, "w", encoding="utf-8-sig") as f:
+        f.write(text.replace("Croatia,Serbia and Montenegro,Refugees,160000",
+                             "Croatia,Serbia and Montenegro,Refugees,170000"))
+
+    assert os.path.getsize(csv_path) == before.manifest["consumed_bytes"]
+    after = open_store(csv_path, store_dir)
+    assert after.generation != before.generation
+    assert 170000 in after.partition("1991–1992")["Number_Displaced"].tolist()
+    pd.testing.assert_frame_equal(rows(after), rows(fresh(csv_path, tmp_path)))
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name or ".old" in name]
+
+
+def test_interrupted_append_is_truncated(csv_path, tmp_path):
+    # An append that wrote partition files but died before its manifest
+    store_dir = str(tmp_path / "store")
+    store = open_store(csv_path, store_dir)
+    for column in ["Period", "Origin_Country", "Number_Displaced"]:
+        with open(partition_file(store, "1991–1992", column), "ab") as f:
+            f.write(b"\x07" * 12)
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write(NEW_ROWS)
+
+    after = open_store(csv_path, store_dir)
+    assert after.generation == store.generation
+    assert os.path.getsize(partition_file(after, "1991–1992")) == \
+        after.manifest["partitions"]["1991–1992"]["rows"] * 4
+    pd.testing.assert_frame_equal(rows(after), rows(fresh(csv_path, tmp_path)))
+
+# -----------------------------
+# FULL BUILD
+# -----------------------------
+def test_failed_build_leaves_the_store_in_place(csv_path, tmp_path):
+    store_dir = str(tmp_path / "store")
+    before = rows(open_store(csv_path, store_dir))
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("1991–1992,Croatia,Germany,Refugees,many,Croatian War,UNHCR\n")
+
+    with pytest.raises(ValueError):
+        build_store(csv_path, store_dir)
+    pd.testing.assert_frame_equal(rows(PartitionedStore(store_dir)), before)
+    assert os.path.exists(os.path.join(store_dir, MANIFEST))
@@ -0,0 +1,96 @@
+import gzip
+import io
+import json
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+import export
+from datastore import open_store
+from geography import country_coords
+
+DATA_PATH = "data/Yugoslav_War_Data.csv"
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    return open_store(DATA_PATH, str(tmp_path_factory.mktemp("store")))
+
+
+@pytest.fixture
+def client(store):
+    server = Flask(__name__)
+    export.init_app(server, lambda: store)
+    return server.test_client()
+
+
+def read_csv(response):
+    return pd.read_csv(io.BytesIO(response.data), keep_default_na=False)
+
+# -----------------------------
+# ROWS
+# -----------------------------
+def test_export_uses_the_places_own_coordinates(client):
+    rows = read_csv(client.get("/export/flows.csv?period=1991–1992"))
+    assert len(rows) == 4  # Serbia and Montenegro is split in two
+    for row in rows.itertuples():
+        assert [row.Origin_Lat, row.Origin_Lon] == country_coords[row.Origin_Country]
+        assert [row.Target_Lat, row.Target_Lon] == country_coords[row.Target.replace(" (internal)", "")]
+    assert set(rows["Target"]) == {"Serbia", "Montenegro", "Bosnia and Herzegovina", "Croatia (internal)"}
+
+
+def test_export_filters(client):
+    rows = read_csv(client.get("/export/flows.csv?origin=Kosovo&type=IDPs"))
+    assert rows[["Origin_Country", "Target", "Number_Displaced"]].values.tolist() == [
+        ["Kosovo", "Kosovo (internal)", 550000]]
+
+    rows = read_csv(client.get("/export/flows.csv?period=1991–1992&period=1998–1999"))
+    assert set(rows["Period"]) == {"1991–1992", "1998–1999"}
+    assert read_csv(client.get("/export/flows.csv?origin=Atlantis")).empty
+
+
+def test_export_chunks_match_a_single_chunk(store):
+    whole = pd.concat(export.export_frames(store, {}), ignore_index=True)
+    chunked = list(export.export_frames(store, {}, chunk_rows=2))
+    assert len(chunked) > len(store.periods)
+    pd.testing.assert_frame_equal(pd.concat(chunked, ignore_index=True), whole)
+
+    csv = b"".join(export.csv_chunks(export.export_frames(store, {}, chunk_rows=2))).decode("utf-8")
+    assert csv.count("Period,") == 1
+    assert len(csv.splitlines()) == len(whole) + 1
+
+# -----------------------------
+# ROUTE
+# -----------------------------
+def test_export_is_gzipped_when_accepted(client):
+    plain = client.get("/export/flows.csv")
+    zipped = client.get("/export/flows.csv", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers["ETag"] != plain.headers["ETag"]
+
+
+def test_export_not_modified(client):
+    first = client.get("/export/flows.csv?type=Refugees")
+    etag = first.headers["ETag"]
+    repeat = client.get("/export/flows.csv?type=Refugees", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304 and not repeat.data
+    other = client.get("/export/flows.csv?type=IDPs", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+
+def test_export_geojson_and_parquet(client):
+    collection = json.loads(client.get("/export/flows.geojson?period=1991–1992").data)
+    lines = [feature["geometry"]["coordinates"] for feature in collection["features"]]
+    assert [country_coords["Croatia"][::-1], country_coords["Bosnia and Herzegovina"][::-1]] in lines
+
+    pytest.importorskip("pyarrow")
+    frame = pd.read_parquet(io.BytesIO(client.get("/export/flows.parquet?period=1991–1992").data))
+    assert frame.columns.tolist() == export.COLUMNS
+    assert len(frame) == 4
+
+
+def test_export_unknown_format(client):
+    assert client.get("/export/flows.xlsx").status_code == 404
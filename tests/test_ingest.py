@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import synthetic_chunk
+from flowtable import FlowTable
+from geography import country_coords, disaggregation_rules
+from ingest import parse_displacement, parse_displacement_column, read_displacement_csv
+from odmatrix import ODMatrix, destination_totals
+
+DATA_PATH = "data/Yugoslav_War_Data.csv"
+
+
+def reference_parse(values):
+    return values.apply(parse_displacement).fillna(0).astype("int64").to_numpy()
+
+# -----------------------------
+# PARSING
+# -----------------------------
+def test_parse_matches_rowwise_reference():
+    values = pd.Series(["10,000–20,000", "265,000", "160000", " 1,500 ", "1,000 – 3,001",
+                        "7–8", "0", None, np.nan, "999,999,999,999", 160000], dtype=object)
+    assert parse_displacement_column(values).tolist() == reference_parse(values).tolist()
+
+
+def test_parse_allows_surrounding_whitespace_and_newlines():
+    values = pd.Series(["\t42\n", "1,000\n–\n2,000", "7"], dtype=object)
+    assert parse_displacement_column(values).tolist() == reference_parse(values).tolist() == [42, 1500, 7]
+
+
+def test_parse_missing_counts_are_zero():
+    values = pd.Series([None, "1,000", pd.NA], dtype=object)
+    assert parse_displacement_column(values).tolist() == [0, 1000, 0]
+
+
+def test_parse_string_dtype():
+    values = pd.Series(["1,000", "2–4", None], dtype="string")
+    assert parse_displacement_column(values).tolist() == [1000, 3, 0]
+
+
+@pytest.mark.parametrize("bad", ["abc", "1 000", "1–2–3x", "", "1–", "–5", "1.5", "1e3"])
+def test_parse_rejects_what_the_reference_rejects(bad):
+    with pytest.raises(ValueError):
+        parse_displacement(bad)
+    with pytest.raises(ValueError):
+        parse_displacement_column(pd.Series(["1,000", bad], dtype=object))
+
+
+@pytest.mark.parametrize("rows", [1, 5_000, 100_000])
+def test_parse_matches_reference_on_synthetic_data(rows):
+    values = synthetic_chunk(rows, np.random.default_rng(rows))["Number Displaced"]
+    assert (parse_displacement_column(values).to_numpy() == reference_parse(values)).all()
+
+# -----------------------------
+# PIE SLICES
+# -----------------------------
+# The row-by-row pie aggregation the dashboard used before, with the splits
+# read from disaggregation_rules instead of being spelled out.
+def reference_slices(period_df):
+    slices = {}
+    for _, row in period_df.iterrows():
+        dest, n, origin = row["Destination_Country"], row["Number_Displaced"], row["Origin_Country"]
+        rule = disaggregation_rules.get(dest)
+        if rule is None:
+            slices.setdefault(dest, []).append((n, origin))
+            continue
+        parts = {place: weight for place, weight in rule["targets"].items()
+                 if place in country_coords and not (rule.get("exclude_origin") and place == origin)}
+        total = sum(parts.values())
+        for place, weight in parts.items():
+            label = f"{place} (internal)" if rule["internal"] else place
+            slices.setdefault(label, []).append((n * weight // total, origin))
+    return {label: (sum(n for n, _ in entries), {origin for _, origin in entries})
+            for label, entries in slices.items()}
+
+
+def test_pie_slices_match_rowwise_reference():
+    data = read_displacement_csv(DATA_PATH)
+    for period in data["Period"].cat.categories:
+        period_df = data[data["Period"] == period]
+        pie = destination_totals(ODMatrix.from_frame(period_df), FlowTable.from_frame(period_df))
+        expected = reference_slices(period_df)
+        assert pie["label"].tolist() == list(expected), period
+        for label, value, hover in pie.itertuples(index=False):
+            total, origins = expected[label]
+            assert value == total, (period, label)
+            assert set(hover.split(" → ")[0].removeprefix("From: ").split(", ")) == origins, (period, label)
+
+
+def test_pie_splits_repeated_keys_once_per_cell():
+    # Rows repeating an origin-destination-type key are summed into one cell
+    # before the split, so each part is floor(sum * weight / total) rather
+    # than the row-wise sum of floors (3 // 2 + 5 // 2 = 3 each)
+    period_df = pd.DataFrame({
+        "Origin_Country": ["Croatia", "Croatia", "Kosovo"],
+        "Destination_Country": ["Serbia and Montenegro"] * 3,
+        "Type": ["Refugees"] * 3,
+        "Number_Displaced": [3, 5, 7],
+    })
+    pie = destination_totals(ODMatrix.from_frame(period_df), FlowTable.from_frame(period_df))
+    assert dict(zip(pie["label"], pie["value"])) == {"Serbia": 4 + 3, "Montenegro": 4 + 3}
+    assert {label: total for label, (total, _) in reference_slices(period_df).items()} == {
+        "Serbia": 3 + 3, "Montenegro": 3 + 3}
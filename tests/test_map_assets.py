@@ -0,0 +1,45 @@
+import gzip
+
+import pytest
+from flask import Flask
+
+import map_assets
+
+PAGE = b"<html>" + b"period map " * 500 + b"</html>"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(map_assets, "MAPS_DIR", str(tmp_path))
+    monkeypatch.setattr(map_assets, "_assets", {})
+    (tmp_path / "map.html").write_bytes(PAGE)
+    server = Flask(__name__)
+    map_assets.init_app(server)
+    return server.test_client()
+
+
+def test_each_content_coding_has_its_own_etag(client):
+    url = map_assets.map_url(f"{map_assets.MAPS_DIR}/map.html")
+    plain = client.get(url)
+    zipped = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert plain.data == PAGE
+    assert gzip.decompress(zipped.data) == PAGE
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert plain.headers["ETag"] == f'"{map_assets.asset_info("map.html")["etag"]}"'
+    assert zipped.headers["ETag"] == plain.headers["ETag"][:-1] + '-gz"'
+    assert plain.headers["Vary"] == zipped.headers["Vary"] == "Accept-Encoding"
+
+
+def test_not_modified_only_for_the_same_coding(client):
+    url = map_assets.map_url(f"{map_assets.MAPS_DIR}/map.html")
+    zipped_etag = client.get(url, headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+    assert client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": zipped_etag}).status_code == 304
+    plain = client.get(url, headers={"If-None-Match": zipped_etag})
+    assert plain.status_code == 200 and plain.data == PAGE
+
+
+def test_versioned_urls_are_immutable(client):
+    url = map_assets.map_url(f"{map_assets.MAPS_DIR}/map.html")
+    assert client.get(url).headers["Cache-Control"] == map_assets.IMMUTABLE_CACHE
+    assert client.get("/maps/stale/map.html").headers["Cache-Control"] == map_assets.STALE_CACHE
+    assert client.get("/maps/stale/missing.html").status_code == 404
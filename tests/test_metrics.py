@@ -0,0 +1,27 @@
+from flask import Flask
+
+import metrics
+
+
+def _client(monkeypatch, token):
+    monkeypatch.setattr(metrics, "PROFILER_TOKEN", token)
+    server = Flask(__name__)
+    metrics.init_app(server)
+    return server.test_client()
+
+
+def test_profiler_hidden_without_token(monkeypatch):
+    client = _client(monkeypatch, None)
+    assert client.get("/debug/profiler").status_code == 404
+
+
+def test_profiler_reads_and_writes_need_the_token(monkeypatch):
+    client = _client(monkeypatch, "secret")
+    for method in (client.get, client.post):
+        assert method("/debug/profiler").status_code == 403
+        assert method("/debug/profiler", headers={"X-Profiler-Token": "wrong"}).status_code == 403
+    response = client.get("/debug/profiler", headers={"X-Profiler-Token": "secret"})
+    assert response.status_code == 200
+    assert "slow_requests" in response.get_json()
+    response = client.post("/debug/profiler?enable=0", headers={"X-Profiler-Token": "secret"})
+    assert response.get_json()["enabled"] is False
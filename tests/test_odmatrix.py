@@ -0,0 +1,68 @@
+import pandas as pd
+
+from odmatrix import ODMatrix
+
+ROWS = [
+    ("Croatia", "Serbia", "Refugees", 100),
+    ("Croatia", "Serbia", "Refugees", 20),
+    ("Croatia", "Croatia (internal)", "IDPs", 300),
+    ("Serbia", "Croatia", "Refugees", 50),
+    ("Kosovo", "Albania", "Refugees", 400),
+    ("Kosovo", "Serbia", "IDPs", 10),
+    ("Kosovo", "Serbia", "Refugees", 5),
+    ("Bosnia and Herzegovina", "Germany", "Refugees", 0),
+]
+
+
+def matrix():
+    return ODMatrix.from_frame(pd.DataFrame(ROWS, columns=["Origin_Country", "Destination_Country", "Type",
+                                                           "Number_Displaced"]))
+
+
+def test_repeated_keys_are_one_cell_and_zeros_are_dropped():
+    assert list(matrix().cells()) == [
+        ("Croatia", "Serbia", "Refugees", 120),
+        ("Croatia", "Croatia (internal)", "IDPs", 300),
+        ("Serbia", "Croatia", "Refugees", 50),
+        ("Kosovo", "Albania", "Refugees", 400),
+        ("Kosovo", "Serbia", "IDPs", 10),
+        ("Kosovo", "Serbia", "Refugees", 5),
+    ]
+
+
+def test_totals_follow_first_appearance():
+    od = matrix()
+    assert od.destination_totals().to_dict() == {"Serbia": 135, "Croatia (internal)": 300, "Croatia": 50,
+                                                 "Albania": 400}
+    assert list(od.destination_totals().index) == ["Serbia", "Croatia (internal)", "Croatia", "Albania"]
+    assert od.origin_totals().to_dict() == {"Croatia": 420, "Serbia": 50, "Kosovo": 415}
+    external = od.origin_totals(where=lambda name: "internal" not in name)
+    assert external.to_dict() == {"Croatia": 120, "Serbia": 50, "Kosovo": 415}
+
+
+def test_type_totals():
+    od = matrix()
+    assert od.type_totals().to_dict() == {"Refugees": 575, "IDPs": 310}
+    assert od.type_totals(origin="Kosovo").to_dict() == {"Refugees": 405, "IDPs": 10}
+    assert od.type_totals(destination="Serbia").to_dict() == {"Refugees": 125, "IDPs": 10}
+    assert od.type_totals(origin="Kosovo", destination="Serbia").to_dict() == {"IDPs": 10, "Refugees": 5}
+    assert od.type_totals(origin="Atlantis").empty
+
+
+def test_flows_between_places():
+    od = matrix()
+    assert od.flow("Croatia", "Serbia") == 120
+    assert od.flow("Kosovo", "Serbia") == 15
+    assert od.flow("Albania", "Kosovo") == 0
+    assert od.net_flow("Croatia", "Serbia") == 70
+    assert od.net_flow("Serbia", "Croatia") == -70
+    assert od.net_flow("Croatia", "Atlantis") == 0
+
+
+def test_top_corridors():
+    od = matrix()
+    top = od.top_corridors(3)
+    assert top.values.tolist() == [["Kosovo", "Albania", 400], ["Croatia", "Croatia (internal)", 300],
+                                   ["Croatia", "Serbia", 120]]
+    assert len(od.top_corridors(100)) == 5
+    assert od.top_corridors(0).empty
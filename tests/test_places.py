@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from geography import country_coords
+from odmatrix import ODMatrix
+from places import Gazetteer, GridIndex
+
+COUNTRIES = [(name, "country", None, lat, lon) for name, (lat, lon) in country_coords.items()]
+# Split lies nearer the "Croatia and Bosnia" and BiH points than Croatia's
+DALMATIA = [("Dalmatia", "region", "Croatia", 43.5, 16.4),
+            ("Split", "municipality", "Dalmatia", 43.51, 16.44)]
+
+
+def test_finer_places_need_a_parent():
+    with pytest.raises(ValueError, match="Dalmatia"):
+        Gazetteer.from_rows(COUNTRIES + [("Dalmatia", "region", None, 43.5, 16.4)])
+
+
+@pytest.mark.parametrize("parent", ["Other former Yugoslav republics", "Serbia and Montenegro",
+                                    "Croatia and Bosnia", "Croatia (internal)", "Atlantis"])
+def test_parent_must_be_a_real_place(parent):
+    with pytest.raises(ValueError, match="Dalmatia"):
+        Gazetteer.from_rows(COUNTRIES + [("Dalmatia", "region", parent, 43.5, 16.4)])
+
+
+def test_parent_must_be_coarser():
+    with pytest.raises(ValueError, match="Split"):
+        Gazetteer.from_rows(COUNTRIES + [("Dalmatia", "region", "Croatia", 43.5, 16.4),
+                                         ("Split", "region", "Dalmatia", 43.51, 16.44)])
+
+
+def test_places_roll_up_to_their_parent():
+    places = Gazetteer.from_rows(COUNTRIES + DALMATIA)
+    assert places.ancestor("Split", 0) == "Croatia"
+    assert places.ancestor("Split", 1) == "Dalmatia"
+    assert places.ancestor("Split (internal)", 0) == "Croatia (internal)"
+
+    matrix = ODMatrix.from_frame(pd.DataFrame({
+        "Origin_Country": ["Bosnia and Herzegovina", "Split", "Croatia"],
+        "Destination_Country": ["Split", "Germany", "Split"],
+        "Type": ["Refugees", "Refugees", "IDPs"],
+        "Number_Displaced": [100, 40, 7],
+    }))
+    cells = sorted(places.rollup(matrix, 0).cells())
+    assert cells == [("Bosnia and Herzegovina", "Croatia", "Refugees", 100),
+                     ("Croatia", "Croatia (internal)", "IDPs", 7),
+                     ("Croatia", "Germany", "Refugees", 40)]
+
+
+def test_grid_index_radius_query_matches_brute_force():
+    rng = np.random.default_rng(0)
+    index = GridIndex.from_coords(rng.uniform(40, 47, 2_000), rng.uniform(13, 23, 2_000), 0.05)
+    for i in range(0, 2_000, 97):
+        for radius in (0.01, 0.05, 0.2):
+            near = (index.x - index.x[i]) ** 2 + (index.y - index.y[i]) ** 2 <= radius ** 2
+            assert index.within(index.x[i], index.y[i], radius).tolist() == np.flatnonzero(near).tolist()
@@ -0,0 +1,79 @@
+import logging
+import shutil
+
+import numpy as np
+import pytest
+
+from datastore import open_store
+from odmatrix import ODMatrix, destination_totals
+from timeindex import build_time_index, period_months
+
+DATA_PATH = "data/Yugoslav_War_Data.csv"
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    return open_store(DATA_PATH, str(tmp_path_factory.mktemp("store")))
+
+
+def test_period_windows_reproduce_period_totals(store):
+    # 1991–1992 and 1992–1995 share 1992; neither preset may pick up the other's rows
+    index = build_time_index(store)
+    table = store.flow_table()
+    for period in store.periods:
+        data = store.partition(period)
+        expected = destination_totals(ODMatrix.from_frame(data), table)
+        pie = destination_totals(index.window(*period_months(period)), table)
+        assert pie["label"].tolist() == expected["label"].tolist(), period
+        assert pie["value"].tolist() == expected["value"].tolist(), period
+        assert index.totals(*period_months(period)).sum() == data["Number_Displaced"].sum()
+
+
+def test_period_windows_with_filters(store):
+    index = build_time_index(store)
+    for period in store.periods:
+        data = store.partition(period)
+        totals = index.totals(*period_months(period), {"Type": ["Refugees"]})
+        assert totals.sum() == data.loc[data["Type"] == "Refugees", "Number_Displaced"].sum()
+
+
+def test_other_windows_still_come_from_the_monthly_sums(store):
+    index = build_time_index(store)
+    first, last = period_months("1992")
+    months = index.cumulative[:, last - index.first_month + 1] - index.cumulative[:, first - index.first_month]
+    assert np.array_equal(index.totals(first, last), months)
+
+
+@pytest.mark.parametrize("label, window", [
+    ("1991–1992", (1991 * 12, 1992 * 12 + 11)),
+    ("1992", (1992 * 12, 1992 * 12 + 11)),
+    ("1993-1995", (1993 * 12, 1995 * 12 + 11)),
+    ("1993 Q1", (1993 * 12, 1993 * 12 + 2)),
+    ("1993-03", (1993 * 12 + 2, 1993 * 12 + 2)),
+    ("Mar 1993", (1993 * 12 + 2, 1993 * 12 + 2)),
+    ("1993 Q2–1994 Q1", (1993 * 12 + 3, 1994 * 12 + 2)),
+])
+def test_period_labels(label, window):
+    assert period_months(label) == window
+
+
+@pytest.mark.parametrize("label", ["abc", "1995–1992", "1993-13", ""])
+def test_unknown_period_labels_are_rejected(label):
+    with pytest.raises(ValueError, match="Period"):
+        period_months(label)
+
+
+def test_partitions_with_unknown_labels_are_skipped(store, tmp_path, caplog):
+    csv_path = tmp_path / "data.csv"
+    shutil.copyfile(DATA_PATH, csv_path)
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("sometime,Croatia,Germany,Refugees,1000,Croatian War,UNHCR\n")
+
+    with caplog.at_level(logging.WARNING, logger="timeindex"):
+        index = build_time_index(open_store(str(csv_path), str(tmp_path / "store")))
+    assert "sometime" in caplog.text
+    assert index.spans["sometime"] is None
+    expected = build_time_index(store)
+    assert (index.first_month, index.last_month) == (expected.first_month, expected.last_month)
+    assert index.totals(index.first_month, index.last_month).sum() == \
+        expected.totals(expected.first_month, expected.last_month).sum()
@@ -0,0 +1,225 @@
+import copy
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from ingest import RANGE_DASH
+from odmatrix import ODMatrix, frame_codes
+
+# -----------------------------
+# MONTH AXIS
+# -----------------------------
+# Months are counted from year 0 (month = year * 12 + month_of_year), so a
+# window is a pair of inclusive month numbers.
+KEY_COLUMNS = ["Origin_Country", "Destination_Country", "Type", "Conflict"]
+log = logging.getLogger(__name__)
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+# A Period label is one span or two joined by a dash: a year ("1992"), a
+# quarter ("1993 Q1") or a month ("1993-03", "Mar 1993"). "1991–1992" covers
+# January 1991 through December 1992.
+_SPAN_PATTERNS = [
+    (re.compile(r"(\d{4})"), lambda m: (int(m[1]) * 12, int(m[1]) * 12 + 11)),
+    (re.compile(r"(\d{4})\s*Q([1-4])", re.IGNORECASE),
+     lambda m: (int(m[1]) * 12 + (int(m[2]) - 1) * 3, int(m[1]) * 12 + int(m[2]) * 3 - 1)),
+    (re.compile(r"(\d{4})-(0[1-9]|1[0-2])"), lambda m: (int(m[1]) * 12 + int(m[2]) - 1,) * 2),
+    (re.compile(r"([A-Za-z]{3})[a-z]*\.?\s+(\d{4})"),
+     lambda m: (int(m[2]) * 12 + MONTH_NAMES.index(m[1].title()),) * 2 if m[1].title() in MONTH_NAMES else None),
+]
+_DASHES = re.compile(rf"\s*[{RANGE_DASH}—-]\s*|\s+to\s+")
+
+
+def _span(text):
+    for pattern, months in _SPAN_PATTERNS:
+        match = pattern.fullmatch(text.strip())
+        if match:
+            return months(match)
+    return None
+
+
+def period_months(period):
+    # (first, last) month of a Period label; ValueError when it is not one
+    label = str(period)
+    window = _span(label)
+    for dash in _DASHES.finditer(label):
+        if window is not None:
+            break
+        start, end = _span(label[:dash.start()]), _span(label[dash.end():])
+        if start is not None and end is not None and start[0] <= end[1]:
+            window = (start[0], end[1])
+    if window is None:
+        raise ValueError(f"Period {label!r} is not a year, quarter or month, or a range of them "
+                         f"(e.g. 1992–1995, 1993 Q1, 1993-03, Mar 1993)")
+    return window
+
+
+def month_label(month):
+    return f"{MONTH_NAMES[month % 12]} {month // 12}"
+
+
+def window_label(first, last):
+    return month_label(first) if first == last else f"{month_label(first)} – {month_label(last)}"
+
+# -----------------------------
+# PREFIX-SUM CUBE
+# -----------------------------
+# Monthly counts for every origin–destination–type–conflict key, stored as
+# running totals along the month axis: a sparse period x origin x
+# destination x type x conflict cube holding only the keys that occur. The
+# total for any window is one subtraction per key, however many months it
+# spans. The CSV only has counts per period, so each period's count is spread
+# evenly over its months (the remainder goes to the earliest months), so the
+# months of a period add up to its count. Periods can overlap (1991–1992 and
+# 1992–1995 share 1992), so a window that is exactly a period's window is
+# answered from that period's own totals instead; otherwise the preset would
+# also pick up the months an overlapping period was spread into.
+#
+# Rows appended to the store are added by appended(), which only reads the
+# new rows of each partition. Partitions whose Period label is not a span
+# are left out with a warning, so one bad row cannot stop the index (and
+# with it the dashboard layout) from being built.
+class TimeIndex:
+    def __init__(self, store):
+        self.generation = store.generation
+        self.key_ids = {}        # code tuple -> key id, in order of appearance
+        self.period_totals = {}  # (key id, period) -> count
+        self.rows = {}           # period -> rows already counted
+        self.spans = {}          # period -> (first, last) month, None if skipped
+        self._add(store)
+
+    def appended(self, store):
+        # A new index that also counts the rows appended to the store since
+        # this one was built; None when the store was rebuilt from scratch
+        if store.generation != self.generation:
+            return None
+        index = copy.copy(self)
+        index.key_ids, index.period_totals, index.rows = dict(self.key_ids), dict(self.period_totals), dict(self.rows)
+        index.spans = dict(self.spans)
+        index._add(store)
+        return index
+
+    def _add(self, store):
+        for period in store.periods:
+            if period not in self.spans:
+                try:
+                    self.spans[period] = period_months(period)
+                except ValueError as e:
+                    self.spans[period] = None
+                    log.warning("Leaving partition %s out of the time index: %s", period, e)
+            if self.spans[period] is None:
+                continue
+            start = self.rows.get(period, 0)
+            data = store.partition(period, start)
+            self.rows[period] = start + len(data)
+            if data.empty:
+                continue
+            codes = np.stack([data[column].cat.codes.to_numpy(dtype=np.int64) for column in KEY_COLUMNS], axis=1)
+            local, uniques = pd.factorize(pd.MultiIndex.from_arrays(codes.T))
+            totals = np.zeros(len(uniques), dtype=np.int64)
+            np.add.at(totals, local, data["Number_Displaced"].to_numpy(dtype=np.int64))
+
+            for key, total in zip(uniques, totals):
+                key_id = self.key_ids.setdefault(key, len(self.key_ids))
+                self.period_totals[key_id, period] = self.period_totals.get((key_id, period), 0) + int(total)
+
+        self._build(store)
+        self.source_signature = store.source_signature
+
+    def _build(self, store):
+        key_codes = np.array(list(self.key_ids), dtype=np.int64).reshape(-1, len(KEY_COLUMNS))
+        self.keys = pd.DataFrame({column: pd.Categorical.from_codes(key_codes[:, i], categories=store.categories[column])
+                                  for i, column in enumerate(KEY_COLUMNS)})
+        self.codes = {column: key_codes[:, i] for i, column in enumerate(KEY_COLUMNS)}
+        # Keys coded once for the OD matrix each window returns
+        self.matrix_codes = frame_codes(self.keys)
+
+        spans = {period: self.spans[period] for _, period in self.period_totals}
+        self.first_month = min((first for first, _ in spans.values()), default=0)
+        last_month = max((last for _, last in spans.values()), default=-1)
+        monthly = np.zeros((len(self.key_ids), last_month - self.first_month + 1), dtype=np.int64)
+        for (key, period), total in self.period_totals.items():
+            first, last = spans[period]
+            months = last - first + 1
+            share, remainder = divmod(total, months)
+            start = first - self.first_month
+            monthly[key, start:start + months] += share
+            monthly[key, start:start + remainder] += 1
+
+        self.cumulative = np.zeros((len(self.key_ids), monthly.shape[1] + 1), dtype=np.int64)
+        np.cumsum(monthly, axis=1, out=self.cumulative[:, 1:])
+
+        # Per-key totals of each period's own window
+        self.exact = {}
+        for (key, period), total in self.period_totals.items():
+            self.exact.setdefault(spans[period], np.zeros(len(self.key_ids), dtype=np.int64))[key] += total
+
+    @property
+    def n_months(self):
+        return self.cumulative.shape[1] - 1
+
+    @property
+    def last_month(self):
+        return self.first_month + self.n_months - 1
+
+    def clamp(self, first, last):
+        first = min(max(first, self.first_month), self.last_month)
+        last = min(max(last, first), self.last_month)
+        return first, last
+
+    def totals(self, first, last, filters=None):
+        first, last = self.clamp(first, last)
+        totals = self.exact.get((first, last))
+        if totals is None:
+            totals = (self.cumulative[:, last - self.first_month + 1]
+                      - self.cumulative[:, first - self.first_month])
+        return totals if not filters else np.where(self.mask(filters), totals, 0)
+
+    def window(self, first, last, filters=None):
+        # OD matrix of the window; its cells follow the key order
+        return ODMatrix.from_codes(*self.matrix_codes, self.totals(first, last, filters))
+
+    def flows(self):
+        # The OD-matrix cell (origin, destination, type) each key adds to, in
+        # the order window() gives them, or -1 for keys with missing values;
+        # and those cells' key columns
+        places, types, origin, destination, dtype = self.matrix_codes
+        complete = (origin >= 0) & (destination >= 0) & (dtype >= 0)
+        cell = (origin * len(places) + destination) * max(len(types), 1) + dtype
+        ids = np.full(len(cell), -1, dtype=np.int64)
+        ids[complete] = pd.factorize(cell[complete])[0]
+        first = np.flatnonzero(complete)[np.unique(ids[complete], return_index=True)[1]]
+        return ids, self.keys.iloc[first][KEY_COLUMNS[:3]].reset_index(drop=True)
+
+    # -----------------------------
+    # FILTERS
+    # -----------------------------
+    # filters maps a column to the names to keep; a missing or empty selection
+    # keeps every key. Each selection is a lookup table over the column's
+    # dictionary indexed by the keys' codes, so any combination costs one
+    # array lookup per column.
+    def mask(self, filters):
+        keep = np.ones(len(self.keys), dtype=bool)
+        for column, names in filters.items():
+            if names:
+                keep &= selection_table(self.keys[column].cat.categories, names)[self.codes[column]]
+        return keep
+
+    def options(self, column):
+        # Names that occur in the keys, for the filter controls
+        return sorted(map(str, self.keys[column].dropna().unique()))
+
+
+def selection_table(categories, names):
+    # Boolean per category code, indexed by codes; -1 (missing) hits the
+    # extra last slot and is never selected
+    allowed = np.zeros(len(categories) + 1, dtype=bool)
+    codes = categories.get_indexer(list(names))
+    allowed[codes[codes >= 0]] = True
+    return allowed
+
+
+def build_time_index(store):
+    return TimeIndex(store)